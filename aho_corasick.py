@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Aho-Corasick multi-pattern matching for the RSS Word Frequency Analyzer
+One automaton finds every occurrence of any number of phrases in a
+single pass, so the cost per character does not grow with the number of
+phrases.
+"""
+
+import re
+from collections import deque
+
+# Up to this many phrases a compiled regex finds where a match may start,
+# so the automaton only steps through those stretches of text
+PREFILTER_MAX_PHRASES = 64
+
+
+def normalize_phrase(phrase):
+    """Lowercase a phrase and collapse runs of whitespace to single spaces"""
+    return ' '.join(phrase.lower().split())
+
+
+class AhoCorasick:
+    """Case-insensitive phrase automaton
+
+    Text is matched lowercased, with any run of whitespace treated as a
+    single space, so 'Continue\\n  reading' matches 'continue reading'.
+    Phrases that start or end with a letter or digit only match on word
+    boundaries ('continue reading' does not match inside 'discontinue
+    reading').
+
+    With few phrases, a regex alternation of them (ignoring word
+    boundaries, so it matches at least wherever they do) skips the text
+    between candidates; the per-character loop then only runs from each
+    candidate until the automaton is back at its root.
+    """
+
+    def __init__(self, phrases):
+        self.phrases = []
+        self._goto = [{}]
+        self._fail = [0]
+        self._outputs = [()]
+        for phrase in phrases:
+            normalized = normalize_phrase(phrase)
+            if normalized and normalized not in self.phrases:
+                self._insert(normalized, len(self.phrases))
+                self.phrases.append(normalized)
+        self._build_failure_links()
+        self._prefilter = None
+        if 0 < len(self.phrases) <= PREFILTER_MAX_PHRASES:
+            self._prefilter = re.compile('|'.join(
+                r'\s+'.join(re.escape(word) for word in phrase.split(' '))
+                for phrase in self.phrases
+            ))
+
+    def __len__(self):
+        return len(self.phrases)
+
+    def _insert(self, phrase, index):
+        state = 0
+        for char in phrase:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append(())
+            state = next_state
+        self._outputs[state] = self._outputs[state] + (index,)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._outputs[next_state] += self._outputs[self._fail[next_state]]
+
+    def find_spans(self, text):
+        """(start, end, phrase index) for every match, as offsets into text.lower()"""
+        return self._find(text.lower())
+
+    def _find(self, lowered):
+        spans = []
+        if self._prefilter is None:
+            self._scan(lowered, 0, len(lowered), spans)
+            return spans
+        offset = 0
+        while True:
+            candidate = self._prefilter.search(lowered, offset)
+            if candidate is None:
+                return spans
+            offset = self._scan(lowered, candidate.start(), candidate.end(), spans)
+
+    def _scan(self, lowered, begin, settle, spans):
+        """Step the automaton from the root at offset begin, appending
+        matches to spans, until it is back at the root at or after offset
+        settle; returns the offset it stopped at"""
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        phrases = self.phrases
+        positions = []  # offset in lowered of each normalized character
+        state = 0
+        previous_space = True
+        for offset in range(begin, len(lowered)):
+            if not state and offset >= settle:
+                return offset
+            char = lowered[offset]
+            if char.isspace():
+                if previous_space:
+                    continue
+                char = ' '
+                previous_space = True
+            else:
+                previous_space = False
+            positions.append(offset)
+
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in outputs[state]:
+                phrase = phrases[index]
+                start = positions[len(positions) - len(phrase)]
+                end = offset + 1
+                if phrase[0].isalnum() and start > 0 and lowered[start - 1].isalnum():
+                    continue
+                if phrase[-1].isalnum() and end < len(lowered) and lowered[end].isalnum():
+                    continue
+                spans.append((start, end, index))
+        return len(lowered)
+
+    def remove(self, text):
+        """Lowercased text with every matched phrase replaced by a space"""
+        if not text or not self.phrases:
+            return text
+        lowered = text.lower()
+        spans = self._find(lowered)
+        if not spans:
+            return lowered
+        pieces = []
+        cursor = 0
+        for start, end, _ in sorted(spans):
+            if start > cursor:
+                pieces.append(lowered[cursor:start])
+            pieces.append(' ')
+            cursor = max(cursor, end)
+        pieces.append(lowered[cursor:])
+        return ''.join(pieces)
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Append-only article log for the RSS Word Frequency Analyzer
+Articles are batched into zlib-compressed blocks appended to numbered
+segment files, with a sidecar index of block offsets and time ranges, so
+months of history are re-read by memory-mapped sequential scans that skip
+blocks outside the requested time range.
+"""
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: compactions in separate processes are not serialized
+    fcntl = None
+
+from feed_cache import entry_key
+
+DEFAULT_DIR = 'article_log'
+SEGMENT_BYTES = 16 * 1024 * 1024  # a segment is sealed once it grows past this
+BLOCK_ARTICLES = 512  # buffered articles per block written by flush()
+COMPACT_BLOCK_ARTICLES = 4096  # articles per block in compacted segments
+COMPACT_MIN_SEGMENTS = 4  # sealed, uncompacted segments that trigger compaction
+
+# Segment: a sequence of blocks, each a header (payload length, article
+# count, oldest and newest article time) followed by the zlib-compressed
+# JSON list of article rows in _FIELDS order. The .idx sidecar starts with
+# _INDEX_MAGIC and a compacted flag, then holds (offset, header) for every
+# block; it is rebuilt from the segment whenever it does not match it.
+_FIELDS = ('feed_name', 'guid', 'title', 'description', 'link', 'published',
+           'published_ts', 'first_seen')
+_BLOCK = struct.Struct('<IIdd')
+_INDEX_MAGIC = b'RWLIDX01'
+_INDEX_FLAGS = struct.Struct('<B')
+_INDEX_ENTRY = struct.Struct('<QIIdd')
+
+
+def _article_time(row):
+    return row[6] if row[6] is not None else row[7]
+
+
+def encode_block(rows):
+    """Block header and payload for a list of article rows"""
+    payload = zlib.compress(json.dumps(rows, separators=(',', ':')).encode('utf-8'), 6)
+    times = [_article_time(row) for row in rows]
+    return _BLOCK.pack(len(payload), len(rows), min(times), max(times)) + payload
+
+
+class Segment:
+    """One segment file and its block index (offset, length, count, oldest, newest)
+
+    With repair=False a stale index or torn tail is only read around, not
+    rewritten, since another process may still be appending to the file.
+    """
+
+    def __init__(self, directory, number, repair=True):
+        self.number = number
+        self.path = os.path.join(directory, f'{number:08d}.seg')
+        self.index_path = os.path.join(directory, f'{number:08d}.idx')
+        self.blocks = []
+        self.compacted = False
+        self._load_index(repair)
+        self.inode = os.stat(self.path).st_ino if os.path.exists(self.path) else None
+
+    @property
+    def size(self):
+        """Bytes covered by complete blocks"""
+        if not self.blocks:
+            return 0
+        offset, length = self.blocks[-1][:2]
+        return offset + _BLOCK.size + length
+
+    @property
+    def articles(self):
+        return sum(block[2] for block in self.blocks)
+
+    def _load_index(self, repair):
+        segment_size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        try:
+            with open(self.index_path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = b''
+        if data[:len(_INDEX_MAGIC)] == _INDEX_MAGIC:
+            (flags,) = _INDEX_FLAGS.unpack_from(data, len(_INDEX_MAGIC))
+            start = len(_INDEX_MAGIC) + _INDEX_FLAGS.size
+            entries = (len(data) - start) // _INDEX_ENTRY.size
+            self.blocks = [_INDEX_ENTRY.unpack_from(data, start + i * _INDEX_ENTRY.size)
+                           for i in range(entries)]
+            self.compacted = bool(flags & 1)
+            if self.size == segment_size:
+                return
+        # Missing, stale or torn index: walk the block headers instead
+        self.blocks = []
+        if segment_size:
+            with open(self.path, 'rb') as f:
+                offset = 0
+                while offset + _BLOCK.size <= segment_size:
+                    f.seek(offset)
+                    length, count, oldest, newest = _BLOCK.unpack(f.read(_BLOCK.size))
+                    if offset + _BLOCK.size + length > segment_size:
+                        break
+                    self.blocks.append((offset, length, count, oldest, newest))
+                    offset += _BLOCK.size + length
+            if self.size < segment_size and repair:
+                print(f"Warning: truncating torn block at end of {self.path}")
+                with open(self.path, 'r+b') as f:
+                    f.truncate(self.size)
+        if repair:
+            self.write_index()
+
+    def write_index(self):
+        parts = [_INDEX_MAGIC, _INDEX_FLAGS.pack(int(self.compacted))]
+        parts.extend(_INDEX_ENTRY.pack(*block) for block in self.blocks)
+        temp_path = self.index_path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(b''.join(parts))
+        os.replace(temp_path, self.index_path)
+
+    def append(self, block):
+        """Append an encoded block to the segment and its index"""
+        with open(self.path, 'ab') as f:
+            offset = f.tell()
+            f.write(block)
+        length, count, oldest, newest = _BLOCK.unpack_from(block)
+        entry = (offset, length, count, oldest, newest)
+        self.blocks.append(entry)
+        with open(self.index_path, 'ab') as f:
+            if f.tell() == 0:
+                f.write(_INDEX_MAGIC + _INDEX_FLAGS.pack(int(self.compacted)))
+            f.write(_INDEX_ENTRY.pack(*entry))
+
+    def replaced(self):
+        """True if another process removed or rewrote the file (compaction)"""
+        try:
+            return os.stat(self.path).st_ino != self.inode
+        except FileNotFoundError:
+            return self.inode is not None
+
+    def reader(self):
+        """A SegmentReader of the blocks written so far
+
+        It holds the file open, so it keeps reading the same data even if
+        compaction replaces or removes the segment meanwhile.
+        """
+        return SegmentReader(open(self.path, 'rb') if self.blocks else None, list(self.blocks))
+
+    def remove(self):
+        for path in (self.index_path, self.path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+class SegmentReader:
+    def __init__(self, file, blocks):
+        self.file = file
+        self.blocks = blocks
+
+    def rows(self, since=None, until=None):
+        """Article rows of blocks overlapping [since, until), read through mmap"""
+        blocks = [block for block in self.blocks
+                  if (since is None or block[4] >= since) and (until is None or block[3] < until)]
+        if not blocks:
+            return
+        offset, length = self.blocks[-1][:2]
+        with mmap.mmap(self.file.fileno(), offset + _BLOCK.size + length,
+                       access=mmap.ACCESS_READ) as mapped:
+            for offset, length, _, _, _ in blocks:
+                start = offset + _BLOCK.size
+                yield from json.loads(zlib.decompress(mapped[start:start + length]))
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+class ArticleLog:
+    """Numbered segments in one directory; only the newest one is appended to
+
+    append() buffers articles and flush() writes them as blocks. Sealed
+    segments are merged by compact(), which drops entries logged twice
+    (e.g. refetched after a restart) and rewrites them in time order into
+    larger blocks, which compress better, so time-range scans skip more of them.
+    """
+
+    def __init__(self, directory=DEFAULT_DIR, segment_bytes=SEGMENT_BYTES):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()  # guards the segment list and the buffer
+        self._compact_lock = threading.Lock()
+        self._buffer = []
+        numbers = sorted(int(name[:-4]) for name in os.listdir(directory)
+                         if name.endswith('.seg') and name[:-4].isdigit())
+        self.segments = [Segment(directory, number) for number in numbers]
+        if not self.segments:
+            self.segments.append(Segment(directory, 1))
+        self._compactor = None
+
+    def __len__(self):
+        with self._lock:
+            return sum(segment.articles for segment in self.segments) + len(self._buffer)
+
+    @contextmanager
+    def _directory_locked(self, shared=False):
+        """Advisory lock on the directory's .lock file: exclusive while
+        compacting, shared while readers are opened"""
+        with open(os.path.join(self.directory, '.lock'), 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            yield
+
+    def _reload_segments(self):
+        """Pick up segments another process compacted; call it holding
+        _lock and the directory lock"""
+        numbers = sorted(int(name[:-4]) for name in os.listdir(self.directory)
+                         if name.endswith('.seg') and name[:-4].isdigit())
+        current = {segment.number: segment for segment in self.segments}
+        segments = []
+        for number in numbers:
+            segment = current.get(number)
+            if segment is None or segment.replaced():
+                segment = Segment(self.directory, number, repair=False)
+            segments.append(segment)
+        # The active segment has no file until its first block
+        active = self.segments[-1]
+        if not active.blocks and (not segments or active.number > segments[-1].number):
+            segments.append(active)
+        self.segments = segments or [Segment(self.directory, 1)]
+
+    def append(self, feed_name, articles, seen_at=None):
+        """Buffer articles of feed_name to be written by the next flush()"""
+        seen_at = time.time() if seen_at is None else seen_at
+        rows = [
+            [feed_name, entry_key(article), article['title'], article['description'],
+             article['link'], article['published'], article.get('published_ts'),
+             article.get('first_seen', seen_at)]
+            for article in articles
+        ]
+        with self._lock:
+            self._buffer.extend(rows)
+
+    def flush(self):
+        """Write buffered articles as blocks; returns the number written"""
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+            for start in range(0, len(rows), BLOCK_ARTICLES):
+                active = self.segments[-1]
+                if active.size >= self.segment_bytes:
+                    active = Segment(self.directory, active.number + 1)
+                    self.segments.append(active)
+                active.append(encode_block(rows[start:start + BLOCK_ARTICLES]))
+        return len(rows)
+
+    def scan(self, since=None, until=None, feed_names=None):
+        """Yield logged articles as dicts, optionally limited to a published
+        time range (first_seen for undated entries) and to some feeds
+
+        Segments are read in order but articles are not sorted, and an
+        entry logged twice before compaction is yielded twice. Segments
+        another process has compacted meanwhile are reloaded first.
+        """
+        feed_names = None if feed_names is None else set(feed_names)
+        with self._directory_locked(shared=True), self._lock:
+            self._reload_segments()
+            readers = [segment.reader() for segment in self.segments]
+        try:
+            for reader in readers:
+                for row in reader.rows(since, until):
+                    if feed_names is not None and row[0] not in feed_names:
+                        continue
+                    published = _article_time(row)
+                    if (since is not None and published < since) or \
+                            (until is not None and published >= until):
+                        continue
+                    yield dict(zip(_FIELDS, row))
+        finally:
+            for reader in readers:
+                reader.close()
+
+    def compact(self, min_segments=COMPACT_MIN_SEGMENTS):
+        """Merge the sealed segments not yet compacted into one
+
+        Runs only once at least min_segments of them have built up. The
+        merged segment takes the number of the first input, so segment
+        order stays chronological. Returns the number of segments merged.
+        Compactions by other processes sharing the directory are serialized
+        by an advisory lock on its .lock file.
+        """
+        with self._compact_lock, self._directory_locked():
+            with self._lock:
+                # Another process may have merged some of them meanwhile
+                self._reload_segments()
+                inputs = [s for s in self.segments[:-1] if not s.compacted]
+            if len(inputs) < max(min_segments, 1):
+                return 0
+
+            seen = set()
+            rows = []
+            for segment in inputs:
+                reader = segment.reader()
+                try:
+                    for row in reader.rows():
+                        key = (row[0], row[1])
+                        if key not in seen:
+                            seen.add(key)
+                            rows.append(row)
+                finally:
+                    reader.close()
+            rows.sort(key=_article_time)
+
+            # Left behind by a compaction that crashed; none can be running now
+            for name in os.listdir(self.directory):
+                if name.startswith('compacting-') and name.endswith('.tmp'):
+                    os.remove(os.path.join(self.directory, name))
+            fd, merged_path = tempfile.mkstemp(dir=self.directory, prefix='compacting-', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    for start in range(0, len(rows), COMPACT_BLOCK_ARTICLES):
+                        f.write(encode_block(rows[start:start + COMPACT_BLOCK_ARTICLES]))
+                    f.flush()
+                    os.fsync(f.fileno())
+            except BaseException:
+                os.unlink(merged_path)
+                raise
+
+            # A crash part way leaves entries logged twice, never lost: the
+            # first input is replaced atomically (its stale index removed
+            # first, so it is rebuilt) before the others are deleted
+            with self._lock:
+                first = inputs[0]
+                os.remove(first.index_path)
+                os.replace(merged_path, first.path)
+                for segment in inputs[1:]:
+                    segment.remove()
+                merged = Segment(self.directory, first.number)
+                merged.compacted = True
+                merged.write_index()
+                removed = {segment.number for segment in inputs}
+                self.segments = sorted(
+                    [s for s in self.segments if s.number not in removed] + [merged],
+                    key=lambda s: s.number
+                )
+            return len(inputs)
+
+    def start_compactor(self, interval=3600):
+        """Run compact() every interval seconds on a daemon thread"""
+        if self._compactor is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    merged = self.compact()
+                    if merged:
+                        print(f"Compacted {merged} article log segments")
+                except OSError as e:
+                    print(f"Warning: article log compaction failed: {e}")
+
+        self._compactor = threading.Thread(target=run, name='article-log-compactor', daemon=True)
+        self._compactor.start()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'segments': len(self.segments),
+                'compacted_segments': sum(1 for s in self.segments if s.compacted),
+                'blocks': sum(len(s.blocks) for s in self.segments),
+                'articles': sum(s.articles for s in self.segments),
+                'buffered': len(self._buffer),
+                'bytes': sum(s.size for s in self.segments)
+            }
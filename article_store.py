@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+SQLite article store for the RSS Word Frequency Analyzer
+Keeps every fetched entry, keyed by feed and GUID, with an FTS5 index on
+title and description, so history survives restarts and can be searched.
+"""
+
+import sqlite3
+import threading
+import time
+
+from feed_cache import entry_key
+
+DEFAULT_PATH = 'articles.db'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    feed_name TEXT NOT NULL,
+    guid TEXT NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    description TEXT NOT NULL DEFAULT '',
+    link TEXT NOT NULL DEFAULT '',
+    published TEXT NOT NULL DEFAULT '',
+    published_ts REAL,
+    first_seen REAL NOT NULL,
+    UNIQUE (feed_name, guid)
+);
+CREATE INDEX IF NOT EXISTS articles_published_ts ON articles (published_ts);
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+    title, description, content='articles', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts (rowid, title, description)
+    VALUES (new.id, new.title, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN
+    INSERT INTO articles_fts (articles_fts, rowid, title, description)
+    VALUES ('delete', old.id, old.title, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_au AFTER UPDATE OF title, description ON articles BEGIN
+    INSERT INTO articles_fts (articles_fts, rowid, title, description)
+    VALUES ('delete', old.id, old.title, old.description);
+    INSERT INTO articles_fts (rowid, title, description)
+    VALUES (new.id, new.title, new.description);
+END;
+"""
+
+# Existing rows are only rewritten (and reindexed) when their text changed
+_UPSERT = """
+INSERT INTO articles (feed_name, guid, title, description, link, published,
+                      published_ts, first_seen)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (feed_name, guid) DO UPDATE SET
+    title = excluded.title,
+    description = excluded.description,
+    link = excluded.link,
+    published = excluded.published,
+    published_ts = excluded.published_ts
+WHERE title != excluded.title OR description != excluded.description
+    OR link != excluded.link OR published != excluded.published
+"""
+
+_COLUMNS = 'id, feed_name, guid, title, description, link, published, published_ts, first_seen'
+
+
+def fts_query(text):
+    """Quote each word of free text so FTS5 matches them all, literally"""
+    return ' '.join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+
+class ArticleStore:
+    """Articles in a WAL-mode SQLite database, one connection per thread
+
+    WAL lets any number of readers, in this process or other web worker
+    processes, run alongside a single writer; writers wait up to
+    busy_timeout for each other instead of failing.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, busy_timeout=5.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def add_articles(self, feed_name, articles, seen_at=None):
+        """Insert or refresh a feed's articles in one transaction
+
+        Returns the number of rows inserted or changed.
+        """
+        seen_at = time.time() if seen_at is None else seen_at
+        rows = [
+            (feed_name, entry_key(article), article['title'], article['description'],
+             article['link'], article['published'], article.get('published_ts'), seen_at)
+            for article in articles
+        ]
+        conn = self._connection()
+        with conn:
+            before = conn.total_changes
+            conn.executemany(_UPSERT, rows)
+            # Trigger writes to the FTS table are not counted in total_changes
+            return conn.total_changes - before
+
+    def articles(self, feed_names=None, since=None, until=None, limit=None, offset=0):
+        """Stored articles as dicts, newest first, filtered by feed and by
+        published time (first_seen for undated entries), skipping the
+        first offset"""
+        clauses, params = [], []
+        if feed_names is not None:
+            feed_names = list(feed_names)
+            clauses.append(f"feed_name IN ({', '.join('?' * len(feed_names))})")
+            params.extend(feed_names)
+        if since is not None:
+            clauses.append('COALESCE(published_ts, first_seen) >= ?')
+            params.append(since)
+        if until is not None:
+            clauses.append('COALESCE(published_ts, first_seen) < ?')
+            params.append(until)
+        sql = f'SELECT {_COLUMNS} FROM articles'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY COALESCE(published_ts, first_seen) DESC'
+        if limit is not None or offset:
+            # LIMIT -1 is no limit; SQLite only takes OFFSET after a LIMIT
+            sql += ' LIMIT ? OFFSET ?'
+            params.extend([-1 if limit is None else limit, offset])
+        return [dict(row) for row in self._connection().execute(sql, params)]
+
+    def search(self, text, feed_names=None, limit=50, offset=0):
+        """Articles whose title or description contains every word of text,
+        best BM25 match first, with a highlighted snippet"""
+        query = fts_query(text)
+        if not query:
+            return []
+        sql = (f"SELECT {', '.join('a.' + c for c in _COLUMNS.split(', '))}, "
+               "snippet(articles_fts, -1, '<mark>', '</mark>', '...', 16) AS snippet "
+               'FROM articles_fts JOIN articles a ON a.id = articles_fts.rowid '
+               'WHERE articles_fts MATCH ?')
+        params = [query]
+        if feed_names is not None:
+            feed_names = list(feed_names)
+            sql += f" AND a.feed_name IN ({', '.join('?' * len(feed_names))})"
+            params.extend(feed_names)
+        sql += ' ORDER BY bm25(articles_fts) LIMIT ? OFFSET ?'
+        params.extend([limit, offset])
+        return [dict(row) for row in self._connection().execute(sql, params)]
+
+    def known_guids(self, feed_name, guids):
+        """The subset of guids already stored for feed_name"""
+        guids = list(guids)
+        known = set()
+        conn = self._connection()
+        # Stay under SQLite's default limit on bound parameters
+        for start in range(0, len(guids), 500):
+            chunk = guids[start:start + 500]
+            rows = conn.execute(
+                f"SELECT guid FROM articles WHERE feed_name = ? AND guid IN ({', '.join('?' * len(chunk))})",
+                [feed_name] + chunk
+            )
+            known.update(row['guid'] for row in rows)
+        return known
+
+    def entry_keys(self, after_id=0):
+        """(id, feed name, guid) of the rows with an id above after_id, by id"""
+        return self._connection().execute(
+            'SELECT id, feed_name, guid FROM articles WHERE id > ? ORDER BY id', (after_id,)
+        )
+
+    def stats(self):
+        row = self._connection().execute(
+            'SELECT COUNT(*) AS articles, COUNT(DISTINCT feed_name) AS feeds, '
+            'MIN(COALESCE(published_ts, first_seen)) AS oldest FROM articles'
+        ).fetchone()
+        return dict(row, path=self.path)
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the RSS Word Frequency Analyzer text pipeline
+
+Record the default feeds once, then replay them offline:
+    python benchmark.py record
+    python benchmark.py html
+    python benchmark.py tokenize
+    python benchmark.py parallel
+    python benchmark.py phrases
+    python benchmark.py log
+    python benchmark.py bodies
+"""
+
+import argparse
+import html
+import os
+import random
+import re
+import shutil
+import tempfile
+import time
+
+from aho_corasick import AhoCorasick
+from article_log import ArticleLog
+from article_store import ArticleStore
+from body_store import BodyStore, compress, decompress
+from parallel_count import count_texts_parallel
+from text_pipeline import TOKENIZERS, html_to_text, legacy_strip_tags, make_tokenizer
+
+CORPUS_DIR = 'bench_corpus'
+
+
+def record_corpus(corpus_dir=CORPUS_DIR):
+    """Download every default feed body into corpus_dir"""
+    import requests
+    from rss_analyzer_main import RSSWordAnalyzer
+
+    os.makedirs(corpus_dir, exist_ok=True)
+    feeds = RSSWordAnalyzer().default_feeds
+    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+    for feed_name, feed_url in feeds.items():
+        try:
+            response = requests.get(feed_url, headers=headers, timeout=15)
+            response.raise_for_status()
+        except Exception as e:
+            print(f"Skipping {feed_name}: {e}")
+            continue
+        file_name = re.sub(r'[^A-Za-z0-9]+', '_', feed_name).strip('_') + '.xml'
+        with open(os.path.join(corpus_dir, file_name), 'wb') as f:
+            f.write(response.content)
+        print(f"Recorded {feed_name} ({len(response.content)} bytes)")
+
+
+def synthetic_descriptions(count=2000, seed=42):
+    """Generate feed-like HTML descriptions when no corpus has been recorded"""
+    rng = random.Random(seed)
+    words = ['security', 'election', 'market', 'update', 'climate', 'court',
+             'r&eacute;sum&eacute;', 'AT&amp;T', 'caf&#233;', 'report', 'policy']
+    descriptions = []
+    for i in range(count):
+        body = ' '.join(rng.choice(words) for _ in range(rng.randint(20, 120)))
+        descriptions.append(
+            f'<div class="entry"><p>{body}</p><a href="https://example.com/{i}">'
+            f'continue reading</a><script>var x = "{body[:40]}";</script>'
+            f'<style>p {{ color: red; }}</style><img src="x.png" /></div>'
+        )
+    # A few malformed entries with many unclosed '<'
+    descriptions.extend('a < b ' * 2000 for _ in range(5))
+    return descriptions
+
+
+def load_descriptions(corpus_dir=CORPUS_DIR):
+    """Return entry descriptions from the recorded corpus, or a synthetic set"""
+    if not os.path.isdir(corpus_dir) or not os.listdir(corpus_dir):
+        print(f"No recorded corpus in {corpus_dir}/, using synthetic descriptions")
+        return synthetic_descriptions()
+
+    import feedparser
+    descriptions = []
+    for file_name in sorted(os.listdir(corpus_dir)):
+        feed = feedparser.parse(os.path.join(corpus_dir, file_name))
+        for entry in feed.entries[:50]:
+            description = getattr(entry, 'description', '') or getattr(entry, 'summary', '')
+            if description:
+                descriptions.append(description)
+    return descriptions
+
+
+def time_call(func, items, repeat=5):
+    """Best wall time of applying func to every item"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_html(descriptions):
+    """Compare the fused HTML-to-text stage against the legacy regex"""
+    size_mb = sum(len(d) for d in descriptions) / 1e6
+    print(f"{len(descriptions)} descriptions, {size_mb:.2f} MB")
+    candidates = (
+        ('legacy re.sub', legacy_strip_tags),
+        ('legacy + unescape', lambda d: html.unescape(legacy_strip_tags(d))),
+        ('html_to_text', html_to_text),
+    )
+    for label, func in candidates:
+        elapsed = time_call(func, descriptions)
+        print(f"  {label:<18} {elapsed * 1000:8.1f} ms  {size_mb / elapsed:8.1f} MB/s")
+
+
+def bench_tokenize(descriptions):
+    """Throughput of each tokenizer mode in MB/s over cleaned descriptions"""
+    texts = [html_to_text(d) for d in descriptions]
+    size_mb = sum(len(t.encode('utf-8')) for t in texts) / 1e6
+    print(f"{len(texts)} texts, {size_mb:.2f} MB of UTF-8")
+    legacy = re.compile(r'\b[a-zA-Z]{3,}\b')
+    elapsed = time_call(lambda t: legacy.findall(t.lower()), texts)
+    print(f"  {'legacy findall':<18} {size_mb / elapsed:8.1f} MB/s")
+    for mode in TOKENIZERS:
+        tokenizer = make_tokenizer(mode)
+        elapsed = time_call(tokenizer.tokenize, texts)
+        tokens = sum(len(tokenizer.tokenize(t)) for t in texts)
+        print(f"  {mode:<18} {size_mb / elapsed:8.1f} MB/s  {tokens} tokens")
+
+
+def bench_parallel(descriptions, max_workers=None, target_mb=50):
+    """Scaling of the process-pool counter with the number of workers"""
+    texts = [html_to_text(d) for d in descriptions]
+    # Repeat the corpus to backfill size so pool overhead is amortised
+    size = sum(len(t) for t in texts) or 1
+    texts = texts * max(1, int(target_mb * 1e6 // size))
+    size_mb = sum(len(t.encode('utf-8')) for t in texts) / 1e6
+    print(f"{len(texts)} texts, {size_mb:.1f} MB of UTF-8")
+    settings = make_tokenizer().settings()
+    max_workers = max_workers or os.cpu_count() or 1
+    baseline = None
+    workers = 1
+    while workers <= max_workers:
+        start = time.perf_counter()
+        counts = count_texts_parallel(texts, settings, workers=workers)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"  {workers:>3} workers {elapsed:8.2f} s  {size_mb / elapsed:8.1f} MB/s  "
+              f"speedup {baseline / elapsed:5.2f}x  ({len(counts)} distinct words)")
+        workers *= 2
+
+
+def random_phrases(count, seed=7):
+    """Random two to five word phrases that mostly do not occur in the corpus"""
+    rng = random.Random(seed)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    return [' '.join(''.join(rng.choice(letters) for _ in range(rng.randint(3, 8)))
+                     for _ in range(rng.randint(2, 5)))
+            for _ in range(count)]
+
+
+def bench_phrases(descriptions, counts=(10, 100, 1000, 10000)):
+    """Stop-phrase removal time as the number of phrases grows
+
+    The automaton scans each character once whatever the phrase count; a
+    regex alternation is shown for comparison.
+    """
+    texts = [html_to_text(d) for d in descriptions]
+    size_mb = sum(len(t) for t in texts) / 1e6
+    print(f"{len(texts)} texts, {size_mb:.2f} MB")
+    for count in counts:
+        phrases = ['continue reading', 'the post appeared first on'] + random_phrases(count)
+        start = time.perf_counter()
+        automaton = AhoCorasick(phrases)
+        build = time.perf_counter() - start
+        elapsed = time_call(automaton.remove, texts, repeat=3)
+        pattern = re.compile('|'.join(re.escape(p) for p in phrases), re.IGNORECASE)
+        regex = time_call(lambda t: pattern.sub(' ', t), texts, repeat=3)
+        print(f"  {count:>6} phrases  automaton {elapsed * 1000:8.1f} ms "
+              f"(build {build * 1000:6.1f} ms)  regex alternation {regex * 1000:8.1f} ms")
+
+
+def bench_log(descriptions, days=90, per_hour=60):
+    """Time to read months of history back from the article log versus the
+    SQLite article store, for a full scan and for the last week"""
+    texts = [html_to_text(d) for d in descriptions]
+    rng = random.Random(3)
+    now = time.time()
+    count = days * 24 * per_hour
+    articles = [{
+        'title': f'Entry {i}', 'description': rng.choice(texts), 'link': f'https://example.com/{i}',
+        'published': '', 'published_ts': now - days * 86400 + i * 3600 / per_hour
+    } for i in range(count)]
+    directory = tempfile.mkdtemp()
+    try:
+        log = ArticleLog(os.path.join(directory, 'log'), segment_bytes=1024 * 1024)
+        store = ArticleStore(os.path.join(directory, 'articles.db'))
+        for start in range(0, count, per_hour):
+            batch = articles[start:start + per_hour]
+            feed_name = f'feed {start // per_hour % 50}'
+            log.append(feed_name, batch)
+            store.add_articles(feed_name, batch)
+        log.flush()
+        start = time.perf_counter()
+        merged = log.compact(min_segments=1)
+        print(f"{count} articles over {days} days, log {log.stats()['bytes'] / 1e6:.1f} MB "
+              f"(compacted {merged} segments in {time.perf_counter() - start:.2f} s), "
+              f"database {os.path.getsize(store.path) / 1e6:.1f} MB")
+        for label, since in (('all', None), ('last 7 days', now - 7 * 86400)):
+            start = time.perf_counter()
+            scanned = sum(1 for _ in log.scan(since=since))
+            log_time = time.perf_counter() - start
+            start = time.perf_counter()
+            stored = len(store.articles(since=since))
+            store_time = time.perf_counter() - start
+            print(f"  {label:<12} log {scanned:>8} in {log_time:6.2f} s "
+                  f"({scanned / log_time:9.0f}/s)  sqlite {stored:>8} in {store_time:6.2f} s "
+                  f"({stored / store_time:9.0f}/s)")
+        store.close()
+    finally:
+        shutil.rmtree(directory)
+
+
+def synthetic_feed_bodies(descriptions, feeds=10, fetches=60, items=30, seed=5):
+    """Successive fetches of RSS feeds: each fetch adds one or two items at the
+    top and drops the oldest, as real feeds do"""
+    rng = random.Random(seed)
+    for feed in range(feeds):
+        header = (f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0" '
+                  f'xmlns:dc="http://purl.org/dc/elements/1.1/" '
+                  f'xmlns:content="http://purl.org/rss/1.0/modules/content/">'
+                  f'<channel><title>Feed {feed}</title><link>https://feed{feed}.example.com/</link>'
+                  f'<description>Synthetic feed {feed}</description>')
+        entries = []
+        for fetch in range(fetches):
+            for _ in range(rng.randint(1, 2)):
+                n = len(entries)
+                entries.insert(0, f'<item><title>Item {n} of feed {feed}</title>'
+                                  f'<link>https://feed{feed}.example.com/{n}</link>'
+                                  f'<guid>https://feed{feed}.example.com/{n}</guid>'
+                                  f'<description>{html.escape(rng.choice(descriptions))}</description>'
+                                  f'<dc:creator>Author {rng.randint(1, 5)}</dc:creator></item>')
+            body = header + ''.join(entries[:items]) + '</channel></rss>'
+            yield f'Feed {feed}', body.encode('utf-8')
+
+
+def bench_bodies(descriptions):
+    """Compression ratio and decode speed of stored feed bodies with trained
+    dictionaries, against plain zlib of each body on its own"""
+    bodies = list(synthetic_feed_bodies(descriptions))
+    raw = sum(len(body) for _, body in bodies)
+    directory = tempfile.mkdtemp()
+    try:
+        store = BodyStore(directory)
+        start = time.perf_counter()
+        for feed_name, body in bodies:
+            store.add(feed_name, body)
+        elapsed = time.perf_counter() - start
+        stats = store.stats()
+        plain = [compress(body) for _, body in bodies]
+        start = time.perf_counter()
+        for payload in plain:
+            decompress(payload)
+        plain_decode = raw / (time.perf_counter() - start) / 1e6
+        print(f"{len(bodies)} bodies from {stats['feeds']} feeds, {raw / 1e6:.1f} MB "
+              f"(stored in {elapsed:.2f} s)")
+        print(f"  plain zlib   ratio {raw / sum(map(len, plain)):6.2f}  decode {plain_decode:7.1f} MB/s")
+        print(f"  dictionaries ratio {stats['ratio']:6.2f}  decode {stats['decode_mb_per_s']:7.1f} MB/s  "
+              f"({stats['dictionaries']['feed']} feed, {stats['dictionaries']['global']} global)")
+    finally:
+        shutil.rmtree(directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['record', 'html', 'tokenize', 'parallel', 'phrases', 'log', 'bodies'])
+    parser.add_argument('--corpus', default=CORPUS_DIR)
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        record_corpus(args.corpus)
+    elif args.command == 'html':
+        bench_html(load_descriptions(args.corpus))
+    elif args.command == 'tokenize':
+        bench_tokenize(load_descriptions(args.corpus))
+    elif args.command == 'parallel':
+        bench_parallel(load_descriptions(args.corpus))
+    elif args.command == 'phrases':
+        bench_phrases(load_descriptions(args.corpus))
+    elif args.command == 'log':
+        bench_log(load_descriptions(args.corpus))
+    elif args.command == 'bodies':
+        bench_bodies(load_descriptions(args.corpus))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Raw feed body archive for the RSS Word Frequency Analyzer
+Every changed body a feed serves is kept, compressed with a zlib preset
+dictionary trained on that feed's earlier fetches (or on all feeds, until
+a feed has enough of its own), since consecutive fetches of a feed repeat
+the same channel header, namespaces and most of their items.
+"""
+
+import hashlib
+import os
+import re
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers in separate processes are not serialized
+    fcntl = None
+
+DEFAULT_DIR = 'feed_bodies'
+DICTIONARY_BYTES = 32 * 1024  # zlib only looks back 32 KB, so more is wasted
+TRAIN_SAMPLES = 20  # most recent bodies a dictionary is trained on
+MIN_TRAIN_SAMPLES = 3  # bodies a feed needs before it gets its own dictionary
+RETRAIN_EVERY = 50  # bodies stored with a dictionary before it is retrained
+
+# File: MAGIC, uint16 feed name length, feed name, then records of a
+# header (payload length, dictionary id, body length, fetch time, body
+# hash) and the compressed body. Dictionary id 0 means plain zlib; others
+# name files in the dictionaries/ directory, '-feed' or '-global'.
+MAGIC = b'RWBODY01'
+_NAME_LENGTH = struct.Struct('<H')
+_RECORD = struct.Struct('<IIId16s')
+
+
+def _segments(body):
+    """Pieces of a body split after every '>', so markup and the text just
+    before it are counted as units"""
+    return [segment for segment in re.split(rb'(?<=>)', body) if len(segment) >= 8]
+
+
+def train_dictionary(samples, size=DICTIONARY_BYTES):
+    """A zlib preset dictionary of the pieces found in more than one sample
+
+    Pieces are ranked by how many samples contain them times their length,
+    and the most valuable go last, where zlib reaches them with the
+    shortest distances.
+    """
+    frequency = Counter()
+    for sample in samples:
+        frequency.update(set(_segments(sample)))
+    ranked = sorted(((count * len(segment), segment)
+                     for segment, count in frequency.items() if count > 1), reverse=True)
+    chosen, total = [], 0
+    for _, segment in ranked:
+        if total + len(segment) <= size:
+            chosen.append(segment)
+            total += len(segment)
+    return b''.join(reversed(chosen))
+
+
+@contextmanager
+def _locked(path):
+    """Advisory lock on path + '.lock', shared by every process using path"""
+    with open(path + '.lock', 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+
+def compress(body, dictionary=None):
+    compressor = zlib.compressobj(6, zdict=dictionary) if dictionary else zlib.compressobj(6)
+    return compressor.compress(body) + compressor.flush()
+
+
+def decompress(payload, dictionary=None):
+    decompressor = zlib.decompressobj(zdict=dictionary) if dictionary else zlib.decompressobj()
+    return decompressor.decompress(payload) + decompressor.flush()
+
+
+class FeedBodies:
+    """Append-only file of one feed's bodies
+
+    The record index is rebuilt on open by jumping from record header to
+    record header, and extended by refresh() with records other processes
+    appended since. Appends and refreshes hold the file's lock.
+    """
+
+    def __init__(self, path, feed_name=None):
+        self.path = path
+        self.feed_name = feed_name
+        self.records = []  # (payload offset, payload length, dictionary id, body length, fetched_at, hash)
+        self._indexed = 0  # bytes of the file covered by the header and indexed records
+        with self.locked():
+            if not os.path.exists(path):
+                name = feed_name.encode('utf-8')
+                with open(path, 'wb') as f:
+                    f.write(MAGIC + _NAME_LENGTH.pack(len(name)) + name)
+            self.refresh()
+
+    def locked(self):
+        return _locked(self.path)
+
+    def refresh(self):
+        """Index the records appended since the last call; call it holding locked()"""
+        with open(self.path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            offset = self._indexed
+            if not offset:
+                header = f.read(len(MAGIC) + _NAME_LENGTH.size)
+                if header[:len(MAGIC)] != MAGIC:
+                    raise ValueError(f'{self.path} is not a feed body file')
+                (name_length,) = _NAME_LENGTH.unpack_from(header, len(MAGIC))
+                self.feed_name = f.read(name_length).decode('utf-8')
+                offset = len(header) + name_length
+            while offset + _RECORD.size <= size:
+                f.seek(offset)
+                length, dictionary_id, body_length, fetched_at, body_hash = _RECORD.unpack(f.read(_RECORD.size))
+                if offset + _RECORD.size + length > size:
+                    break
+                self.records.append((offset + _RECORD.size, length, dictionary_id,
+                                     body_length, fetched_at, body_hash))
+                offset += _RECORD.size + length
+        self._indexed = offset
+        if offset < size:
+            # Writers hold the lock, so this is left by one that crashed
+            print(f"Warning: truncating torn record at end of {self.path}")
+            with open(self.path, 'r+b') as f:
+                f.truncate(offset)
+
+    def append(self, payload, dictionary_id, body_length, fetched_at, body_hash):
+        """Append a record; call it holding locked(), after refresh()"""
+        with open(self.path, 'ab') as f:
+            offset = f.tell()
+            f.write(_RECORD.pack(len(payload), dictionary_id, body_length, fetched_at, body_hash))
+            f.write(payload)
+        self.records.append((offset + _RECORD.size, len(payload), dictionary_id,
+                             body_length, fetched_at, body_hash))
+        self._indexed = offset + _RECORD.size + len(payload)
+
+    def payloads(self, records):
+        """Payloads of the given records, read with one open"""
+        with open(self.path, 'rb') as f:
+            result = []
+            for offset, length, *_ in records:
+                f.seek(offset)
+                result.append(f.read(length))
+            return result
+
+
+class BodyStore:
+    """Feed bodies per feed, with their trained dictionaries, in one directory"""
+
+    def __init__(self, directory=DEFAULT_DIR):
+        self.directory = directory
+        self.dictionary_dir = os.path.join(directory, 'dictionaries')
+        os.makedirs(self.dictionary_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._dictionaries = {}  # id -> bytes, loaded on first use
+        self._list_dictionaries()
+        self._added_since_global = 0
+        self.feeds = {}
+        for name in os.listdir(directory):
+            if name.endswith('.bodies'):
+                bodies = FeedBodies(os.path.join(directory, name))
+                self.feeds[bodies.feed_name] = bodies
+
+    def _path(self, feed_name):
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', feed_name).strip('_')[:40]
+        digest = hashlib.blake2b(feed_name.encode('utf-8'), digest_size=4).hexdigest()
+        return os.path.join(self.directory, f'{slug}-{digest}.bodies')
+
+    def _list_dictionaries(self):
+        """Read which dictionary ids exist, including those other processes saved"""
+        self._feed_dictionaries = set()
+        self._global_dictionaries = []
+        for name in os.listdir(self.dictionary_dir):
+            number, _, kind = name.partition('-')
+            if kind == 'feed.zdict':
+                self._feed_dictionaries.add(int(number))
+            elif kind == 'global.zdict':
+                self._global_dictionaries.append(int(number))
+        self._global_dictionaries.sort()
+        self._next_dictionary = max(self._feed_dictionaries | set(self._global_dictionaries),
+                                    default=0) + 1
+
+    def _dictionary(self, dictionary_id):
+        if dictionary_id == 0:
+            return None
+        dictionary = self._dictionaries.get(dictionary_id)
+        if dictionary is None:
+            if dictionary_id not in self._feed_dictionaries and \
+                    dictionary_id not in self._global_dictionaries:
+                self._list_dictionaries()
+            kind = 'feed' if dictionary_id in self._feed_dictionaries else 'global'
+            with open(os.path.join(self.dictionary_dir, f'{dictionary_id:06d}-{kind}.zdict'), 'rb') as f:
+                dictionary = self._dictionaries[dictionary_id] = f.read()
+        return dictionary
+
+    def _save_dictionary(self, dictionary, kind):
+        """Write a dictionary under a new id and return the id
+
+        Ids are claimed under the dictionary directory's lock, after
+        listing what other processes saved, and the file is linked into
+        place only if no file of that name exists, so a dictionary bodies
+        were stored with is never overwritten.
+        """
+        fd, temp_path = tempfile.mkstemp(dir=self.dictionary_dir, prefix='.zdict-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(dictionary)
+                f.flush()
+                os.fsync(f.fileno())
+            with _locked(self.dictionary_dir):
+                self._list_dictionaries()
+                while True:
+                    dictionary_id = self._next_dictionary
+                    self._next_dictionary += 1
+                    path = os.path.join(self.dictionary_dir, f'{dictionary_id:06d}-{kind}.zdict')
+                    try:
+                        os.link(temp_path, path)
+                        break
+                    except FileExistsError:
+                        continue
+        finally:
+            os.unlink(temp_path)
+        self._dictionaries[dictionary_id] = dictionary
+        if kind == 'feed':
+            self._feed_dictionaries.add(dictionary_id)
+        else:
+            self._global_dictionaries.append(dictionary_id)
+        return dictionary_id
+
+    def _decode(self, bodies, records):
+        return [decompress(payload, self._dictionary(record[2]))
+                for record, payload in zip(records, bodies.payloads(records))]
+
+    def _current_dictionary(self, bodies):
+        """(dictionary id, bodies stored with it) for the next body of a feed"""
+        if bodies.records and bodies.records[-1][2] in self._feed_dictionaries:
+            current = bodies.records[-1][2]
+            used = sum(1 for record in bodies.records if record[2] == current)
+            return current, used
+        return (self._global_dictionaries[-1] if self._global_dictionaries else 0), None
+
+    def add(self, feed_name, body, fetched_at=None):
+        """Store a body unless it is the same as the feed's previous one
+
+        Returns True if it was stored.
+        """
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        body_hash = hashlib.blake2b(body, digest_size=16).digest()
+        with self._lock:
+            bodies = self.feeds.get(feed_name)
+            if bodies is None:
+                bodies = self.feeds[feed_name] = FeedBodies(self._path(feed_name), feed_name)
+            # Another worker may have appended to the feed since
+            with bodies.locked():
+                bodies.refresh()
+                if bodies.records and bodies.records[-1][5] == body_hash:
+                    return False
+
+                dictionary_id, used = self._current_dictionary(bodies)
+                needs_training = (used is None and len(bodies.records) + 1 >= MIN_TRAIN_SAMPLES) or \
+                    (used is not None and used >= RETRAIN_EVERY)
+                if needs_training:
+                    samples = self._decode(bodies, bodies.records[-(TRAIN_SAMPLES - 1):]) + [body]
+                    dictionary = train_dictionary(samples)
+                    if dictionary:
+                        dictionary_id = self._save_dictionary(dictionary, 'feed')
+                bodies.append(compress(body, self._dictionary(dictionary_id)),
+                              dictionary_id, len(body), fetched_at, body_hash)
+
+            # The global dictionary, for feeds too new to have their own,
+            # is trained on the latest body of each feed
+            self._added_since_global += 1
+            if self._added_since_global >= RETRAIN_EVERY or \
+                    (not self._global_dictionaries and len(self.feeds) >= MIN_TRAIN_SAMPLES):
+                self._added_since_global = 0
+                latest = [b for b in self.feeds.values() if b.records][-TRAIN_SAMPLES:]
+                dictionary = train_dictionary([self._decode(b, b.records[-1:])[0] for b in latest])
+                if dictionary:
+                    self._save_dictionary(dictionary, 'global')
+        return True
+
+    def versions(self, feed_name):
+        """(fetched_at, body bytes, stored bytes) of every stored body of a feed, oldest first"""
+        bodies = self.feeds.get(feed_name)
+        if bodies is None:
+            return []
+        return [(record[4], record[3], record[1]) for record in bodies.records]
+
+    def get(self, feed_name, version=-1):
+        """A stored body of a feed, the latest by default"""
+        with self._lock:
+            bodies = self.feeds[feed_name]
+            return self._decode(bodies, [bodies.records[version]])[0]
+
+    def stats(self):
+        """Sizes and compression ratio, plus decode throughput measured by
+        reading back the latest body of every feed"""
+        with self._lock:
+            records = [record for bodies in self.feeds.values() for record in bodies.records]
+            raw = sum(record[3] for record in records)
+            stored = sum(record[1] for record in records)
+            start = time.perf_counter()
+            decoded = sum(len(body) for bodies in self.feeds.values() if bodies.records
+                          for body in self._decode(bodies, bodies.records[-1:]))
+            elapsed = time.perf_counter() - start
+            return {
+                'feeds': len(self.feeds),
+                'bodies': len(records),
+                'body_bytes': raw,
+                'stored_bytes': stored,
+                'ratio': round(raw / stored, 2) if stored else None,
+                'with_dictionary': sum(1 for record in records if record[2]),
+                'dictionaries': {'feed': len(self._feed_dictionaries),
+                                 'global': len(self._global_dictionaries)},
+                'decode_mb_per_s': round(decoded / elapsed / 1e6, 1) if decoded and elapsed else None
+            }
@@ -8,7 +8,6 @@ with customizable feed selection and word filtering, now with source links.
 from flask import Flask, render_template, request, jsonify
 import pandas as pd
 import feedparser
-import re
 from collections import Counter
 import requests
 from urllib.parse import urlparse
@@ -18,6 +17,9 @@ import threading
 import json
 import os
 
+from inverted_index import InvertedIndex
+from text_pipeline import TokenCountCache, html_to_text, make_tokenizer
+
 app = Flask(__name__)
 
 class RSSWordAnalyzer:
@@ -48,6 +50,15 @@ class RSSWordAnalyzer:
         }
         self.custom_stopwords = set()
         self.selected_feeds = {}
+        self.tokenizer = make_tokenizer()
+        self.token_cache = TokenCountCache()
+        
+        # Inverted index of the last analysis: word -> ids in indexed_articles
+        self.indexed_articles = []
+        self.article_index = InvertedIndex()
+        self.feed_article_ranges = {}
+        # Stopword-filtered words of each feed, most frequent first
+        self.feed_ranked_words = {}
         
         # Default RSS feeds organized by category
         self.default_feeds = {
@@ -116,6 +127,9 @@ class RSSWordAnalyzer:
                     settings = json.load(f)
                     self.custom_stopwords = set(settings.get('custom_stopwords', []))
                     self.selected_feeds = settings.get('selected_feeds', self.default_feeds.copy())
+                    if 'tokenizer' in settings:
+                        self.tokenizer = make_tokenizer(**settings['tokenizer'])
+                        self.token_cache.clear()
             except:
                 self.selected_feeds = self.default_feeds.copy()
         else:
@@ -125,7 +139,8 @@ class RSSWordAnalyzer:
         """Save current settings to file"""
         settings = {
             'custom_stopwords': list(self.custom_stopwords),
-            'selected_feeds': self.selected_feeds
+            'selected_feeds': self.selected_feeds,
+            'tokenizer': self.tokenizer.settings()
         }
         with open('settings.json', 'w') as f:
             json.dump(settings, f, indent=2)
@@ -151,8 +166,8 @@ class RSSWordAnalyzer:
                 link = getattr(entry, 'link', '')
                 pub_date = getattr(entry, 'published', '')
                 
-                # Clean HTML tags from description
-                description = re.sub('<[^<]+?>', '', description)
+                # Strip tags, script/style content and decode entities in one pass
+                description = html_to_text(description)
                 
                 articles.append({
                     'title': title,
@@ -170,76 +185,66 @@ class RSSWordAnalyzer:
     
     def extract_words(self, text):
         """Extract words from text, converting to lowercase and removing punctuation"""
-        if not text:
-            return []
-        
-        # Convert to lowercase and extract words (letters only, minimum 3 characters)
-        words = re.findall(r'\b[a-zA-Z]{3,}\b', text.lower())
-        return words
+        # Tokenizer mode and length policy come from settings ('unicode' by default)
+        return self.tokenizer.tokenize(text)
+    
+    def count_words(self, text):
+        """Return a shared Counter of the words in text, cached by content hash"""
+        return self.token_cache.get_counts(text, self.tokenizer.tokenize)
     
     def analyze_feeds(self):
-        """Fetch all selected feeds and analyze word frequency with source tracking"""
+        """Fetch all selected feeds and analyze word frequency with source tracking
+        
+        Which articles contain each word is recorded in an inverted index
+        over positions in all_articles; each feed's articles occupy a
+        contiguous range of ids, kept in feed_article_ranges.
+        """
         all_articles = []
         feed_word_counts = {}
-        feed_word_sources = {}  # Track which articles contain each word
+        article_index = InvertedIndex()
+        feed_article_ranges = {}
+        all_stopwords = self.default_stopwords.union(self.custom_stopwords)
         
         # Fetch all feeds
         for feed_name, feed_url in self.selected_feeds.items():
             print(f"Fetching {feed_name}...")
             articles = self.fetch_feed(feed_name, feed_url)
+            first_id = len(all_articles)
             all_articles.extend(articles)
+            feed_article_ranges[feed_name] = (first_id, len(all_articles))
             
-            # Track word counts and sources by feed
-            feed_words = []
-            word_to_articles = {}  # Map words to articles that contain them
-            
-            for article in articles:
-                title_words = self.extract_words(article['title'])
-                desc_words = self.extract_words(article['description'])
-                article_words = set(title_words + desc_words)  # Use set to avoid double-counting words in same article
-                
-                feed_words.extend(title_words + desc_words)
-                
-                # Track which articles contain which words
-                for word in article_words:
-                    if word not in word_to_articles:
-                        word_to_articles[word] = []
-                    word_to_articles[word].append({
-                        'title': article['title'],
-                        'link': article['link'],
-                        'published': article['published']
-                    })
+            # Track word counts by feed and index which articles contain each word
+            feed_counter = Counter()
+            for article_id, article in enumerate(articles, first_id):
+                title_counts = self.count_words(article['title'])
+                desc_counts = self.count_words(article['description'])
+                feed_counter.update(title_counts)
+                feed_counter.update(desc_counts)
+                article_index.add(article_id, title_counts.keys() | desc_counts.keys())
             
             # Filter out stopwords for this feed
-            all_stopwords = self.default_stopwords.union(self.custom_stopwords)
-            filtered_feed_words = [word for word in feed_words if word not in all_stopwords]
-            feed_word_counts[feed_name] = Counter(filtered_feed_words)
-            
-            # Store source information for filtered words
-            feed_word_sources[feed_name] = {}
-            for word in feed_word_counts[feed_name]:
-                if word in word_to_articles:
-                    feed_word_sources[feed_name][word] = word_to_articles[word]
+            for word in all_stopwords:
+                feed_counter.pop(word, None)
+            feed_word_counts[feed_name] = feed_counter
+        
+        self.indexed_articles = all_articles
+        self.article_index = article_index
+        self.feed_article_ranges = feed_article_ranges
+        self.feed_ranked_words = {
+            feed_name: feed_counter.most_common()
+            for feed_name, feed_counter in feed_word_counts.items()
+        }
         
         if not all_articles:
-            return pd.DataFrame(), pd.DataFrame(), {}, {}
+            return pd.DataFrame(), pd.DataFrame(), {}
         
         # Create DataFrame
         df = pd.DataFrame(all_articles)
         
-        # Extract all words
-        all_words = []
-        for _, article in df.iterrows():
-            title_words = self.extract_words(article['title'])
-            desc_words = self.extract_words(article['description'])
-            all_words.extend(title_words + desc_words)
-        
-        # Filter out stopwords
-        all_stopwords = self.default_stopwords.union(self.custom_stopwords)
-        filtered_words = [word for word in all_words if word not in all_stopwords]
-        
-        # Count word frequency
-        word_counts = Counter(filtered_words)
+        # The overall counts are the sum of the already filtered per-feed counts
+        word_counts = Counter()
+        for feed_counter in feed_word_counts.values():
+            word_counts.update(feed_counter)
         
         # Create word frequency DataFrame
         word_freq_df = pd.DataFrame([
@@ -247,7 +252,45 @@ class RSSWordAnalyzer:
             for word, count in word_counts.most_common(200)
         ])
         
-        return df, word_freq_df, feed_word_counts, feed_word_sources
+        return df, word_freq_df, feed_word_counts
+    
+    def word_sources(self, word, feed_name=None, offset=0, limit=10):
+        """Title, link and date of the articles of the last analysis that
+        contain word, optionally only those of one feed
+        
+        Returns (sources, total) where total counts all matching articles.
+        """
+        start, stop = self.feed_article_ranges.get(feed_name, (0, 0)) if feed_name else (0, None)
+        articles = self.indexed_articles
+        sources = [
+            {
+                'title': articles[article_id]['title'],
+                'link': articles[article_id]['link'],
+                'published': articles[article_id]['published']
+            }
+            for article_id in self.article_index.lookup(word, start, stop, offset, limit)
+        ]
+        return sources, self.article_index.count(word, start, stop)
+    
+    def feed_words(self, feed_name, offset=0, limit=50):
+        """A page of a feed's words by frequency, with the feed's word total,
+        or None if the feed was not in the last analysis"""
+        ranked = self.feed_ranked_words.get(feed_name)
+        if ranked is None:
+            return None
+        page = [{'word': word, 'frequency': count}
+                for word, count in ranked[offset:offset + limit]]
+        return page, len(ranked)
+    
+    def feed_summary(self):
+        """Articles and distinct words per feed of the last analysis"""
+        return {
+            feed_name: {
+                'articles': stop - start,
+                'unique_words': len(self.feed_ranked_words.get(feed_name, ()))
+            }
+            for feed_name, (start, stop) in self.feed_article_ranges.items()
+        }
 
 def create_html_template():
     """Create the HTML template content with enhanced source link display"""
@@ -649,7 +692,6 @@ def create_html_template():
     <script>
         let currentFeeds = {};
         let currentResults = null;
-        let currentWordSources = null;
         
         document.addEventListener('DOMContentLoaded', function() {
             loadFeeds();
@@ -807,7 +849,6 @@ def create_html_template():
         
         function displayResults(data) {
             currentResults = data;
-            currentWordSources = data.feed_word_sources || {};
             
             document.getElementById('stats').innerHTML = 
                 '<div class="stat-card"><div class="stat-number">' + (data.total_articles || 0) + 
@@ -822,8 +863,8 @@ def create_html_template():
                 displayWordTable(data.word_frequency);
             }
             
-            if (data.feed_word_counts) {
-                displayFeedBreakdown(data.feed_word_counts);
+            if (data.feeds) {
+                displayFeedBreakdown(data.feeds);
             }
         }
         
@@ -853,14 +894,14 @@ def create_html_template():
             });
         }
         
-        function displayFeedBreakdown(feedWordCounts) {
+        function displayFeedBreakdown(feeds) {
             const feedTabs = document.getElementById('feed-tabs');
             const feedContents = document.getElementById('feed-contents');
             
             feedTabs.innerHTML = '';
             feedContents.innerHTML = '';
             
-            const feedNames = Object.keys(feedWordCounts);
+            const feedNames = Object.keys(feeds);
             
             feedNames.forEach((feedName, index) => {
                 // Create tab
@@ -870,54 +911,92 @@ def create_html_template():
                 tab.onclick = () => showFeedContent(feedName);
                 feedTabs.appendChild(tab);
                 
-                // Create content
+                // Create content; its words are fetched the first time it is shown
                 const content = document.createElement('div');
                 content.className = 'feed-content' + (index === 0 ? ' active' : '');
                 content.id = 'feed-content-' + index;
+                content.dataset.feedName = feedName;
+                feedContents.appendChild(content);
+            });
+            
+            if (feedNames.length > 0) {
+                loadFeedWords(feedNames[0], document.getElementById('feed-content-0'));
+            }
+        }
+        
+        async function loadFeedWords(feedName, content) {
+            if (content.dataset.loaded) return;
+            content.dataset.loaded = 'true';
+            content.innerHTML = '<p class="loading">Loading words...</p>';
+            
+            try {
+                const response = await fetch('/api/feed/' + encodeURIComponent(feedName) + '/words?limit=25');
+                const data = await response.json();
+                content.innerHTML = '';
                 
-                const words = feedWordCounts[feedName];
-                if (words && words.length > 0) {
-                    // Word cloud for this feed with clickable tags
-                    const feedWordCloud = document.createElement('div');
-                    feedWordCloud.className = 'feed-word-cloud';
-                    
-                    words.slice(0, 20).forEach(item => {
-                        const wordTag = document.createElement('span');
-                        wordTag.className = 'feed-word-tag';
-                        wordTag.textContent = item.word + ' (' + item.frequency + ')';
-                        wordTag.onclick = () => showWordSources(item.word, feedName);
-                        wordTag.title = 'Click to see source articles';
-                        feedWordCloud.appendChild(wordTag);
-                    });
-                    
-                    content.appendChild(feedWordCloud);
-                    
-                    // Enhanced table for this feed with expandable rows
-                    const table = document.createElement('table');
-                    table.className = 'enhanced-word-table';
-                    table.innerHTML = '<thead><tr><th>Rank</th><th>Word</th><th>Frequency</th><th>Sources</th></tr></thead>';
-                    
-                    const tbody = document.createElement('tbody');
-                    words.slice(0, 25).forEach((item, i) => {
-                        // Main word row
+                if (data.error || data.words.length === 0) {
+                    content.innerHTML = '<p style="color: #6c757d; padding: 20px;">No words found for this feed.</p>';
+                    return;
+                }
+                
+                // Word cloud for this feed with clickable tags
+                const feedWordCloud = document.createElement('div');
+                feedWordCloud.className = 'feed-word-cloud';
+                
+                data.words.slice(0, 20).forEach(item => {
+                    const wordTag = document.createElement('span');
+                    wordTag.className = 'feed-word-tag';
+                    wordTag.textContent = item.word + ' (' + item.frequency + ')';
+                    wordTag.onclick = () => showWordSources(item.word, feedName);
+                    wordTag.title = 'Click to see source articles';
+                    feedWordCloud.appendChild(wordTag);
+                });
+                
+                content.appendChild(feedWordCloud);
+                
+                // Enhanced table for this feed, extended a page at a time
+                const table = document.createElement('table');
+                table.className = 'enhanced-word-table';
+                table.innerHTML = '<thead><tr><th>Rank</th><th>Word</th><th>Frequency</th><th>Sources</th></tr></thead>';
+                const tbody = document.createElement('tbody');
+                table.appendChild(tbody);
+                content.appendChild(table);
+                
+                const moreBtn = document.createElement('button');
+                moreBtn.className = 'btn btn-secondary';
+                moreBtn.style.marginTop = '15px';
+                moreBtn.textContent = 'Load More Words';
+                content.appendChild(moreBtn);
+                
+                const appendRows = page => {
+                    page.words.forEach((item, i) => {
                         const row = document.createElement('tr');
                         row.className = 'word-row';
-                        row.dataset.word = item.word;
-                        row.dataset.feedName = feedName;
-                        row.innerHTML = '<td>' + (i + 1) + '</td><td><strong>' + 
-                            item.word + '</strong></td><td>' + item.frequency + '</td><td>' +
-                            '<button class="btn btn-secondary" style="font-size: 0.8rem; padding: 4px 8px;" onclick="showWordSources(\\'' + 
-                            item.word.replace(/'/g, "\\'") + '\\', \\'' + feedName.replace(/'/g, "\\'") + '\\')">View Sources</button></td>';
+                        row.innerHTML = '<td>' + (page.offset + i + 1) + '</td><td><strong></strong></td><td>' +
+                            item.frequency + '</td><td></td>';
+                        row.querySelector('strong').textContent = item.word;
+                        const sourcesBtn = document.createElement('button');
+                        sourcesBtn.className = 'btn btn-secondary';
+                        sourcesBtn.style.cssText = 'font-size: 0.8rem; padding: 4px 8px;';
+                        sourcesBtn.textContent = 'View Sources';
+                        sourcesBtn.onclick = () => showWordSources(item.word, feedName);
+                        row.lastChild.appendChild(sourcesBtn);
                         tbody.appendChild(row);
                     });
-                    table.appendChild(tbody);
-                    content.appendChild(table);
-                } else {
-                    content.innerHTML = '<p style="color: #6c757d; padding: 20px;">No words found for this feed.</p>';
-                }
-                
-                feedContents.appendChild(content);
-            });
+                    const shown = page.offset + page.words.length;
+                    moreBtn.style.display = shown < page.total ? 'inline-block' : 'none';
+                    moreBtn.onclick = async () => {
+                        const next = await fetch('/api/feed/' + encodeURIComponent(feedName) +
+                            '/words?limit=25&offset=' + shown);
+                        appendRows(await next.json());
+                    };
+                };
+                appendRows(data);
+            } catch (error) {
+                delete content.dataset.loaded;
+                content.innerHTML = '';
+                showError('Error loading words for ' + feedName + ': ' + error.message);
+            }
         }
         
         function showFeedContent(feedName) {
@@ -938,43 +1017,73 @@ def create_html_template():
                 const tabText = document.querySelectorAll('.feed-tab')[index].textContent;
                 if (tabText === feedName) {
                     content.classList.add('active');
+                    loadFeedWords(feedName, content);
                 } else {
                     content.classList.remove('active');
                 }
             });
         }
         
-        function showWordSources(word, feedName) {
+        async function showWordSources(word, feedName) {
             const modal = document.getElementById('word-sources-modal');
             const modalTitle = document.getElementById('modal-word-title');
             const modalContent = document.getElementById('modal-sources-content');
             
             modalTitle.textContent = 'Articles containing "' + word + '" from ' + feedName;
+            modalContent.innerHTML = '<p class="loading">Loading sources...</p>';
+            modal.style.display = 'block';
             
-            // Get sources for this word from this feed
-            const sources = currentWordSources[feedName] && currentWordSources[feedName][word] || [];
+            const sourcesUrl = '/api/word/' + encodeURIComponent(word) + '/sources?feed=' +
+                encodeURIComponent(feedName) + '&limit=10';
+            const sourcesGrid = document.createElement('div');
+            sourcesGrid.className = 'sources-grid';
+            const moreBtn = document.createElement('button');
+            moreBtn.className = 'btn btn-secondary';
+            moreBtn.style.marginTop = '15px';
+            moreBtn.textContent = 'Show More Articles';
             
-            if (sources.length === 0) {
-                modalContent.innerHTML = '<p style="color: #6c757d;">No source articles found for this word.</p>';
-            } else {
-                let sourcesHtml = '<div class="sources-grid">';
-                sources.forEach(source => {
+            const appendSources = page => {
+                page.sources.forEach(source => {
                     const publishedDate = source.published ? new Date(source.published).toLocaleDateString() : 'Unknown date';
-                    sourcesHtml += '<div class="source-link">';
+                    const sourceLink = document.createElement('div');
+                    sourceLink.className = 'source-link';
+                    const title = document.createElement(source.link ? 'a' : 'span');
+                    title.textContent = source.title || 'Untitled Article';
                     if (source.link) {
-                        sourcesHtml += '<a href="' + source.link + '" target="_blank" rel="noopener noreferrer">' + 
-                            (source.title || 'Untitled Article') + '</a>';
-                    } else {
-                        sourcesHtml += '<span>' + (source.title || 'Untitled Article') + '</span>';
+                        title.href = source.link;
+                        title.target = '_blank';
+                        title.rel = 'noopener noreferrer';
                     }
-                    sourcesHtml += '<div class="source-date">' + publishedDate + '</div>';
-                    sourcesHtml += '</div>';
+                    const date = document.createElement('div');
+                    date.className = 'source-date';
+                    date.textContent = publishedDate;
+                    sourceLink.appendChild(title);
+                    sourceLink.appendChild(date);
+                    sourcesGrid.appendChild(sourceLink);
                 });
-                sourcesHtml += '</div>';
-                modalContent.innerHTML = sourcesHtml;
-            }
+                const shown = page.offset + page.sources.length;
+                moreBtn.style.display = shown < page.total ? 'inline-block' : 'none';
+                moreBtn.onclick = async () => {
+                    const next = await fetch(sourcesUrl + '&offset=' + shown);
+                    appendSources(await next.json());
+                };
+            };
             
-            modal.style.display = 'block';
+            try {
+                const response = await fetch(sourcesUrl);
+                const data = await response.json();
+                
+                if (data.error || data.total === 0) {
+                    modalContent.innerHTML = '<p style="color: #6c757d;">No source articles found for this word.</p>';
+                    return;
+                }
+                modalContent.innerHTML = '';
+                modalContent.appendChild(sourcesGrid);
+                modalContent.appendChild(moreBtn);
+                appendSources(data);
+            } catch (error) {
+                modalContent.innerHTML = '<p style="color: #6c757d;">Error loading sources: ' + error.message + '</p>';
+            }
         }
         
         function closeModal() {
@@ -1059,35 +1168,63 @@ def update_stopwords():
         analyzer.save_settings()
     return jsonify({'status': 'success'})
 
+def page_args(default_limit):
+    """?offset= and ?limit= query parameters; limit is capped at 500"""
+    offset = max(0, int(request.args.get('offset', 0)))
+    limit = min(500, max(1, int(request.args.get('limit', default_limit))))
+    return offset, limit
+
+@app.route('/api/feed/<path:feed_name>/words')
+def feed_words(feed_name):
+    """A page of one feed's words by frequency from the last analysis"""
+    try:
+        offset, limit = page_args(50)
+    except ValueError:
+        return jsonify({'error': 'offset and limit must be integers'}), 400
+    result = analyzer.feed_words(feed_name, offset, limit)
+    if result is None:
+        return jsonify({'error': f'Feed not in the last analysis: {feed_name}'}), 404
+    words, total = result
+    return jsonify({
+        'feed': feed_name,
+        'words': words,
+        'total': total,
+        'offset': offset,
+        'limit': limit
+    })
+
+@app.route('/api/word/<path:word>/sources')
+def word_sources(word):
+    """A page of the articles containing word, answered from the inverted
+    index; ?feed= limits them to one feed"""
+    try:
+        offset, limit = page_args(10)
+    except ValueError:
+        return jsonify({'error': 'offset and limit must be integers'}), 400
+    feed_name = request.args.get('feed')
+    sources, total = analyzer.word_sources(word.lower(), feed_name, offset, limit)
+    return jsonify({
+        'word': word,
+        'feed': feed_name,
+        'sources': sources,
+        'total': total,
+        'offset': offset,
+        'limit': limit
+    })
+
 @app.route('/api/analyze')
 def analyze():
-    """Perform analysis and return results with source tracking"""
+    """Perform analysis and return a summary; per-feed words and word sources
+    are fetched on demand from /api/feed/<name>/words and /api/word/<word>/sources"""
     try:
-        articles_df, word_freq_df, feed_word_counts, feed_word_sources = analyzer.analyze_feeds()
-        
-        # Format feed word counts for JSON
-        formatted_feed_counts = {}
-        for feed_name, word_counter in feed_word_counts.items():
-            formatted_feed_counts[feed_name] = [
-                {'word': word, 'frequency': count}
-                for word, count in word_counter.most_common(50)
-            ]
-        
-        # Format feed word sources for JSON
-        formatted_feed_sources = {}
-        for feed_name, word_sources in feed_word_sources.items():
-            formatted_feed_sources[feed_name] = {}
-            for word, sources in word_sources.items():
-                # Limit to top 10 sources per word to avoid overwhelming the interface
-                formatted_feed_sources[feed_name][word] = sources[:10]
+        articles_df, word_freq_df, feed_word_counts = analyzer.analyze_feeds()
         
         return jsonify({
-            'articles': articles_df.to_dict('records') if not articles_df.empty else [],
             'word_frequency': word_freq_df.to_dict('records') if not word_freq_df.empty else [],
-            'feed_word_counts': formatted_feed_counts,
-            'feed_word_sources': formatted_feed_sources,
+            'feeds': analyzer.feed_summary(),
             'total_articles': len(articles_df),
             'total_unique_words': len(word_freq_df),
+            'token_cache': analyzer.token_cache.stats(),
             'timestamp': datetime.now().isoformat()
         })
     except Exception as e:
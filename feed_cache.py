@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Per-feed cache for the RSS Word Frequency Analyzer
+Keeps each feed's parsed articles and unfiltered word counts so an
+analysis only fetches feeds that are new or stale.
+"""
+
+import threading
+import time
+
+DEFAULT_MAX_AGE = 15 * 60  # seconds before a feed is fetched again
+
+
+def entry_key(article):
+    """Identity of an entry across downloads: its GUID, else link, else title and date"""
+    return (article.get('guid') or article.get('link')
+            or f"{article.get('title', '')}\n{article.get('published', '')}")
+
+
+class FeedState:
+    """Parsed articles and word counts of one feed, with freshness metadata
+
+    ngram_counts maps an n-gram size to the feed's SpaceSaving summary;
+    unique_words and daily_unique_words are HyperLogLog distinct-word
+    counters for all articles and per UTC day.
+
+    body_hash and the HTTP validators (etag, last_modified) identify the
+    downloaded body, so an unchanged feed can reuse this state without
+    parsing or tokenizing. fetches/unchanged_fetches count downloads of the
+    feed and how many of them were skipped as unchanged.
+    """
+
+    def __init__(self, url, articles, word_counts, ngram_counts=None, unique_words=None,
+                 daily_unique_words=None, fetched_at=None, body_hash=None, etag=None,
+                 last_modified=None, fetches=1, unchanged_fetches=0):
+        self.url = url
+        self.articles = articles
+        self.word_counts = word_counts
+        self.ngram_counts = ngram_counts or {}
+        self.unique_words = unique_words
+        self.daily_unique_words = daily_unique_words or {}
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+        self.body_hash = body_hash
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetches = fetches
+        self.unchanged_fetches = unchanged_fetches
+
+    def age(self, now=None):
+        """Seconds since the feed was fetched"""
+        return (time.time() if now is None else now) - self.fetched_at
+
+    @property
+    def skip_rate(self):
+        """Fraction of fetches whose parse and tokenize work was skipped"""
+        return self.unchanged_fetches / self.fetches if self.fetches else 0.0
+
+    def reuse(self, etag=None, last_modified=None):
+        """A fresh copy of this state for a fetch that returned the same body"""
+        return FeedState(
+            self.url, self.articles, self.word_counts, self.ngram_counts,
+            unique_words=self.unique_words,
+            daily_unique_words=self.daily_unique_words,
+            body_hash=self.body_hash,
+            etag=etag or self.etag,
+            last_modified=last_modified or self.last_modified,
+            fetches=self.fetches + 1,
+            unchanged_fetches=self.unchanged_fetches + 1
+        )
+
+    def metadata(self):
+        """Freshness information for the analysis response"""
+        return {
+            'url': self.url,
+            'articles': len(self.articles),
+            'fetched_at': self.fetched_at,
+            'age_seconds': round(self.age(), 1),
+            'fetches': self.fetches,
+            'unchanged_fetches': self.unchanged_fetches,
+            'skip_rate': round(self.skip_rate, 4)
+        }
+
+
+class FeedCache:
+    """Thread-safe map of feed name to FeedState with a maximum age"""
+
+    def __init__(self, max_age=DEFAULT_MAX_AGE):
+        self.max_age = max_age
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def get_fresh(self, feed_name, url):
+        """Return the cached state if it is for url and younger than max_age"""
+        with self._lock:
+            state = self._states.get(feed_name)
+        if state is None or state.url != url or state.age() > self.max_age:
+            return None
+        return state
+
+    def get(self, feed_name):
+        """Return the cached state regardless of age, or None"""
+        with self._lock:
+            return self._states.get(feed_name)
+
+    def items(self):
+        """Snapshot of (feed name, state) pairs"""
+        with self._lock:
+            return list(self._states.items())
+
+    def put(self, feed_name, state):
+        with self._lock:
+            self._states[feed_name] = state
+
+    def evict_stale(self, keep=()):
+        """Drop states older than max_age, except feeds named in keep"""
+        keep = set(keep)
+        with self._lock:
+            for feed_name, state in list(self._states.items()):
+                if feed_name not in keep and state.age() > self.max_age:
+                    del self._states[feed_name]
+
+    def clear(self):
+        with self._lock:
+            self._states.clear()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Inverted index for the RSS Word Frequency Analyzer
+Maps each word to the sorted ids of the articles containing it, stored as
+delta-encoded varints so a posting costs about one byte.
+"""
+
+from array import array
+from bisect import bisect_left
+
+
+def encode_varint(value, out):
+    """Append value as a LEB128 varint (7 bits per byte, high bit = more)"""
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def iter_varints(data):
+    """Yield the unsigned integers encoded back to back in data"""
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            yield value
+            value = shift = 0
+
+
+def decode_postings(data):
+    """Ascending ids from a posting list of delta varints"""
+    ids = array('I')
+    doc_id = 0
+    for delta in iter_varints(data):
+        doc_id += delta
+        ids.append(doc_id)
+    return ids
+
+
+class InvertedIndex:
+    """Word -> ascending article ids, with words interned to small integer ids
+
+    Articles must be added in increasing id order so every posting list
+    can be extended by appending the gap to its last id.
+    """
+
+    def __init__(self):
+        self.word_ids = {}
+        self.words = []
+        self._postings = []  # word id -> bytearray of delta varints
+        self._last_ids = array('I')  # word id -> last article id appended
+        self._doc_counts = array('I')  # word id -> number of articles
+        self.documents = 0
+        self._max_doc_id = -1
+
+    def __len__(self):
+        return len(self.words)
+
+    def add(self, doc_id, words):
+        """Index the distinct words of article doc_id"""
+        if doc_id <= self._max_doc_id:
+            raise ValueError('articles must be added in increasing id order')
+        self._max_doc_id = doc_id
+        self.documents += 1
+        for word in words:
+            word_id = self.word_ids.get(word)
+            if word_id is None:
+                word_id = self.word_ids[word] = len(self.words)
+                self.words.append(word)
+                self._postings.append(bytearray())
+                self._last_ids.append(0)
+                self._doc_counts.append(0)
+            encode_varint(doc_id - self._last_ids[word_id], self._postings[word_id])
+            self._last_ids[word_id] = doc_id
+            self._doc_counts[word_id] += 1
+
+    def document_frequency(self, word):
+        word_id = self.word_ids.get(word)
+        return 0 if word_id is None else self._doc_counts[word_id]
+
+    def postings(self, word):
+        """Ids of the articles containing word, ascending"""
+        word_id = self.word_ids.get(word)
+        if word_id is None:
+            return array('I')
+        return decode_postings(self._postings[word_id])
+
+    def lookup(self, word, start=0, stop=None, offset=0, limit=None):
+        """Ids of articles containing word within [start, stop), skipping the
+        first offset matches and returning at most limit"""
+        ids = self.postings(word)
+        first = bisect_left(ids, start)
+        last = len(ids) if stop is None else bisect_left(ids, stop)
+        first = min(first + offset, last)
+        if limit is not None:
+            last = min(last, first + limit)
+        return ids[first:last]
+
+    def count(self, word, start=0, stop=None):
+        """Number of articles containing word within [start, stop)"""
+        if start == 0 and stop is None:
+            return self.document_frequency(word)
+        ids = self.postings(word)
+        last = len(ids) if stop is None else bisect_left(ids, stop)
+        return last - bisect_left(ids, start)
+
+    def memory_bytes(self):
+        """Bytes used by the encoded posting lists"""
+        return sum(len(postings) for postings in self._postings)
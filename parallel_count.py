@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Parallel word counting for large corpora
+Splits texts into chunks across a process pool (map), has each worker
+return a compact serialized partial count, and merges the partials
+pairwise in a tree (reduce).
+"""
+
+import os
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from aho_corasick import AhoCorasick
+from text_pipeline import make_tokenizer
+
+# Below this many texts the pool start-up costs more than it saves
+PARALLEL_THRESHOLD = 5000
+
+
+def encode_counts(counts):
+    """Serialize a Counter as (NUL-joined UTF-8 words, uint32 counts)"""
+    words = '\0'.join(counts.keys()).encode('utf-8')
+    values = array('I', counts.values()).tobytes()
+    return words, values
+
+
+def decode_counts(partial):
+    """Inverse of encode_counts"""
+    words, values = partial
+    if not words:
+        return Counter()
+    counts = array('I')
+    counts.frombytes(values)
+    return Counter(dict(zip(words.decode('utf-8').split('\0'), counts)))
+
+
+def _count_chunk(args):
+    """Worker: tokenize a chunk of texts and return its encoded counts"""
+    tokenizer_settings, stop_phrases, texts = args
+    tokenizer = make_tokenizer(**tokenizer_settings)
+    phrase_filter = AhoCorasick(stop_phrases) if stop_phrases else None
+    counts = Counter()
+    for text in texts:
+        if phrase_filter:
+            text = phrase_filter.remove(text)
+        counts.update(tokenizer.tokenize(text))
+    return encode_counts(counts)
+
+
+def _count_each_chunk(args):
+    """Worker: tokenize a chunk of texts and return each one's encoded counts"""
+    tokenizer_settings, stop_phrases, texts = args
+    tokenizer = make_tokenizer(**tokenizer_settings)
+    phrase_filter = AhoCorasick(stop_phrases) if stop_phrases else None
+    partials = []
+    for text in texts:
+        if phrase_filter:
+            text = phrase_filter.remove(text)
+        partials.append(encode_counts(Counter(tokenizer.tokenize(text))))
+    return partials
+
+
+def tree_merge(counters):
+    """Merge Counters pairwise, level by level, into one Counter"""
+    counters = list(counters)
+    if not counters:
+        return Counter()
+    while len(counters) > 1:
+        merged = []
+        for i in range(0, len(counters) - 1, 2):
+            left, right = counters[i], counters[i + 1]
+            # Fold the smaller counter into the larger one
+            if len(left) < len(right):
+                left, right = right, left
+            left.update(right)
+            merged.append(left)
+        if len(counters) % 2:
+            merged.append(counters[-1])
+        counters = merged
+    return counters[0]
+
+
+def chunk_texts(texts, chunks):
+    """Split texts into at most `chunks` contiguous slices"""
+    size = max(1, -(-len(texts) // chunks))
+    return [texts[i:i + size] for i in range(0, len(texts), size)]
+
+
+def count_texts_parallel(texts, tokenizer_settings, workers=None, chunks_per_worker=4,
+                         stop_phrases=()):
+    """Count tokens of every text using a process pool, cutting stop_phrases first"""
+    texts = [text for text in texts if text]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or not texts:
+        return decode_counts(_count_chunk((tokenizer_settings, stop_phrases, texts)))
+
+    jobs = [(tokenizer_settings, stop_phrases, chunk)
+            for chunk in chunk_texts(texts, workers * chunks_per_worker)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        partials = list(pool.map(_count_chunk, jobs))
+    return tree_merge(decode_counts(partial) for partial in partials)
+
+
+def count_each_parallel(texts, tokenizer_settings, workers=None, chunks_per_worker=4,
+                        stop_phrases=()):
+    """Token Counter of each text, in order, using a process pool"""
+    texts = list(texts)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or not texts:
+        partials = _count_each_chunk((tokenizer_settings, stop_phrases, texts))
+    else:
+        jobs = [(tokenizer_settings, stop_phrases, chunk)
+                for chunk in chunk_texts(texts, workers * chunks_per_worker)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            partials = [partial for chunk in pool.map(_count_each_chunk, jobs) for partial in chunk]
+    return [decode_counts(partial) for partial in partials]
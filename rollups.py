@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Pre-aggregated word count rollups for the RSS Word Frequency Analyzer
+Closed hourly and daily buckets of per-feed word counts are appended to
+compressed columnar files, so a word's history over any date range is
+read from a few small records instead of rescanning articles.
+"""
+
+import os
+import struct
+import threading
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+HOUR = 3600
+DAY = 24 * HOUR
+DEFAULT_DIR = 'rollups'
+GRANULARITIES = {'hour': HOUR, 'day': DAY}
+
+# Record: uint32 payload length, then int64 bucket start (epoch seconds)
+# followed by five zlib-compressed columns, each prefixed by its uint32
+# length: feed names and words (NUL-joined dictionaries), and per row the
+# word index, feed index and count. Rows are sorted by word then feed, so
+# one word's rows are a contiguous run found by bisection.
+_LENGTH = struct.Struct('<I')
+_BUCKET = struct.Struct('<q')
+
+
+def encode_bucket(bucket_start, feed_counts):
+    """Serialize {feed name: Counter} for one bucket as a record payload"""
+    feeds = sorted(feed_counts)
+    words = sorted({word for counts in feed_counts.values() for word in counts})
+    word_index = {word: i for i, word in enumerate(words)}
+    # Rows keyed by word index << 16 | feed index sort as plain integers
+    rows = {}
+    for feed_id, feed in enumerate(feeds):
+        for word, count in feed_counts[feed].items():
+            if count > 0:
+                rows[word_index[word] << 16 | feed_id] = count
+    keys = sorted(rows)
+    columns = [
+        '\0'.join(feeds).encode('utf-8'),
+        '\0'.join(words).encode('utf-8'),
+        array('I', (key >> 16 for key in keys)).tobytes(),
+        array('H', (key & 0xFFFF for key in keys)).tobytes(),
+        array('I', map(rows.__getitem__, keys)).tobytes(),
+    ]
+    parts = [_BUCKET.pack(bucket_start)]
+    for column in columns:
+        compressed = zlib.compress(column, 6)
+        parts.append(_LENGTH.pack(len(compressed)))
+        parts.append(compressed)
+    return b''.join(parts)
+
+
+class BucketColumns:
+    """Decoded columns of one rollup record"""
+
+    def __init__(self, payload):
+        self.bucket_start = _BUCKET.unpack_from(payload)[0]
+        offset = _BUCKET.size
+        columns = []
+        for _ in range(5):
+            (length,) = _LENGTH.unpack_from(payload, offset)
+            offset += _LENGTH.size
+            columns.append(zlib.decompress(payload[offset:offset + length]))
+            offset += length
+        feeds, words, row_words, row_feeds, counts = columns
+        self.feeds = feeds.decode('utf-8').split('\0') if feeds else []
+        self.words = words.decode('utf-8').split('\0') if words else []
+        self.row_words = array('I')
+        self.row_words.frombytes(row_words)
+        self.row_feeds = array('H')
+        self.row_feeds.frombytes(row_feeds)
+        self.counts = array('I')
+        self.counts.frombytes(counts)
+
+    def word_counts(self, word):
+        """{feed name: count} of word in this bucket"""
+        word_id = bisect_left(self.words, word)
+        if word_id == len(self.words) or self.words[word_id] != word:
+            return {}
+        first = bisect_left(self.row_words, word_id)
+        last = bisect_right(self.row_words, word_id, first)
+        return {self.feeds[self.row_feeds[row]]: self.counts[row] for row in range(first, last)}
+
+
+class RollupFile:
+    """Append-only file of bucket records for one granularity
+
+    The bucket -> offset index is rebuilt by skipping from header to header
+    on open; a torn record at the end (a crash mid-append) is cut off.
+    Decoded records are kept in a small LRU cache, since closed buckets
+    never change.
+    """
+
+    def __init__(self, path, cache_records=512):
+        self.path = path
+        self.cache_records = cache_records
+        self._lock = threading.Lock()
+        self._offsets = {}  # bucket start -> (offset, length)
+        self._cache = OrderedDict()
+        self._load_index()
+
+    def _load_index(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            offset = 0
+            while offset + _LENGTH.size + _BUCKET.size <= size:
+                f.seek(offset)
+                header = f.read(_LENGTH.size + _BUCKET.size)
+                (length,) = _LENGTH.unpack_from(header)
+                if offset + _LENGTH.size + length > size:
+                    break
+                (bucket_start,) = _BUCKET.unpack_from(header, _LENGTH.size)
+                # A bucket written twice (two workers) keeps its first record
+                self._offsets.setdefault(bucket_start, (offset + _LENGTH.size, length))
+                offset += _LENGTH.size + length
+        if offset < size:
+            print(f"Warning: truncating torn record at end of {self.path}")
+            with open(self.path, 'r+b') as f:
+                f.truncate(offset)
+
+    def __contains__(self, bucket_start):
+        return bucket_start in self._offsets
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def append(self, bucket_start, feed_counts):
+        """Write a closed bucket; buckets already written are left alone"""
+        payload = encode_bucket(bucket_start, feed_counts)
+        with self._lock:
+            if bucket_start in self._offsets:
+                return False
+            with open(self.path, 'ab') as f:
+                offset = f.tell()
+                f.write(_LENGTH.pack(len(payload)) + payload)
+            self._offsets[bucket_start] = (offset + _LENGTH.size, len(payload))
+        return True
+
+    def _read(self, bucket_start):
+        with self._lock:
+            columns = self._cache.get(bucket_start)
+            if columns is not None:
+                self._cache.move_to_end(bucket_start)
+                return columns
+            offset, length = self._offsets[bucket_start]
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            columns = BucketColumns(f.read(length))
+        with self._lock:
+            self._cache[bucket_start] = columns
+            if len(self._cache) > self.cache_records:
+                self._cache.popitem(last=False)
+        return columns
+
+    def history(self, word, start, end, feed_name=None):
+        """(bucket start, {feed: count}) for buckets in [start, end) that mention word"""
+        with self._lock:
+            buckets = sorted(b for b in self._offsets if start <= b < end)
+        series = []
+        for bucket_start in buckets:
+            counts = self._read(bucket_start).word_counts(word)
+            if feed_name is not None:
+                counts = {feed_name: counts[feed_name]} if feed_name in counts else {}
+            if counts:
+                series.append((bucket_start, counts))
+        return series
+
+    def size_bytes(self):
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+
+class RollupStore:
+    """Hourly and daily rollup files in one directory"""
+
+    def __init__(self, directory=DEFAULT_DIR):
+        os.makedirs(directory, exist_ok=True)
+        self.files = {
+            name: RollupFile(os.path.join(directory, f'{name}.col'))
+            for name in GRANULARITIES
+        }
+
+    def close_buckets(self, feed_counts, filled_hours, oldest_hour, closed_before_hour):
+        """Append every hourly and daily bucket that has closed but is not written
+
+        feed_counts(first_hour, last_hour) returns {feed: Counter} for that
+        inclusive hour range and filled_hours are the hours holding counts.
+        Only hours from oldest_hour (the oldest one still held in memory)
+        up to but excluding closed_before_hour are considered, and a day
+        only once all of its hours qualify. Returns the number of records
+        written.
+        """
+        written = 0
+        hourly = self.files['hour']
+        days = set()
+        for hour in sorted(filled_hours):
+            if not oldest_hour <= hour < closed_before_hour:
+                continue
+            days.add(hour // 24)
+            if hour * HOUR not in hourly and hourly.append(hour * HOUR, feed_counts(hour, hour)):
+                written += 1
+
+        daily = self.files['day']
+        for day in sorted(days):
+            # Only days wholly inside the window and wholly closed
+            if day * 24 < oldest_hour or day * 24 + 24 > closed_before_hour:
+                continue
+            if day * DAY not in daily and daily.append(day * DAY, feed_counts(day * 24, day * 24 + 23)):
+                written += 1
+        return written
+
+    def history(self, word, start, end, granularity='day', feed_name=None):
+        return self.files[granularity].history(word, start, end, feed_name)
+
+    def stats(self):
+        return {
+            name: {'buckets': len(rollup), 'bytes': rollup.size_bytes()}
+            for name, rollup in self.files.items()
+        }
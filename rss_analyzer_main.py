@@ -8,21 +8,57 @@ with customizable feed selection and word filtering.
 from flask import Flask, render_template, request, jsonify
 import pandas as pd
 import feedparser
-import re
 from collections import Counter
 import requests
 from urllib.parse import urlparse
 import time
-from datetime import datetime
+from datetime import datetime, timezone
 import threading
 import json
 import os
+import hashlib
+import atexit
+
+from aho_corasick import AhoCorasick, normalize_phrase
+from article_log import ArticleLog
+from article_store import ArticleStore
+from body_store import BodyStore
+from feed_cache import FeedCache, FeedState, entry_key
+from parallel_count import PARALLEL_THRESHOLD, count_each_parallel
+from rollups import GRANULARITIES, RollupStore
+from seen_entries import SeenEntries
+from settings_store import SettingsStore
+import snapshot
+from stemming import MemoizedStemmer
+from sketches import HyperLogLog, SpaceSaving
+from tfidf import DocumentTermMatrix
+from text_pipeline import TokenCountCache, html_to_text, iter_ngrams, make_tokenizer
+from time_windows import day_key, parse_published, recent_day_keys
+from trends import BurstDetector
+from watchlist import Watchlist
+from windowed_counts import HOUR, RING_HOURS, WINDOWS, WindowedWordCounts
 
 app = Flask(__name__)
 
+# Phrases tracked per feed and n-gram size; memory stays bounded however
+# many distinct phrases appear
+NGRAM_CAPACITY = 2000
+
+# Distinct-word estimates are kept per UTC day for this many days
+UNIQUE_WORD_DAYS = 30
+UNIQUE_WORD_WINDOWS = {'1d': 1, '7d': 7, '30d': 30}
+
+# An hour's rollup is written this many hours after it ends, so entries
+# published in it but fetched a little later still make it in
+ROLLUP_GRACE_HOURS = 2
+
+# The per-feed cache is snapshotted at most this often (and at exit), so a
+# restart serves the last results without refetching every feed
+SNAPSHOT_INTERVAL = 300
+
 class RSSWordAnalyzer:
     def __init__(self):
-        self.feeds_data = {}
+        self.feeds_data = FeedCache()  # Per-feed articles and word counts
         self.default_stopwords = {
             'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 
             'of', 'with', 'by', 'from', 'as', 'is', 'are', 'was', 'were', 'be', 
@@ -47,7 +83,63 @@ class RSSWordAnalyzer:
             'much', 'too', 'any', 'may', 'well', 'such'
         }
         self.custom_stopwords = set()
+        # Boilerplate phrases feeds append to entries; removed before tokenizing
+        self.default_stop_phrases = [
+            'appeared first on', 'continue reading', 'read more',
+            'submitted by /u/', '[link]', '[comments]'
+        ]
+        self.custom_stop_phrases = []
+        self.phrase_filter = AhoCorasick(self.default_stop_phrases)
+        self.all_stopwords = frozenset(self.default_stopwords)
         self.selected_feeds = {}
+        self.tokenizer = make_tokenizer()
+        self.token_cache = TokenCountCache()
+        self.stemmer = MemoizedStemmer()
+        self.ngram_sizes = []  # e.g. [2, 3] for bigrams and trigrams
+        # None counts words exactly; a number keeps a fixed-size Space-Saving
+        # summary of that many words per feed and for the merged result
+        self.word_capacity = None
+        # Terms to alert on when they appear in newly downloaded entries
+        self.watchlist = Watchlist()
+        # Per-article term counts of the cached feeds, for TF-IDF
+        self.term_matrix = DocumentTermMatrix()
+        # Hourly word counts by publication time, for windowed top words
+        self.windowed_counts = WindowedWordCounts()
+        # EWMA baseline of each word's hourly count, fed the same new entries
+        self.burst_detector = BurstDetector()
+        # Every fetched entry, kept across restarts and searchable
+        self.article_store = ArticleStore()
+        # Bloom filter of the stored entries, so new ones are found without
+        # querying the store for each
+        self.seen_entries = SeenEntries(self.article_store)
+        # The same entries in compressed append-only segments, for scans
+        # over long histories (backfill, re-analysis)
+        self.article_log = ArticleLog()
+        # Every changed raw feed body, compressed with trained dictionaries
+        self.body_store = BodyStore()
+        # Closed hourly and daily per-feed word counts, for history queries
+        self.rollups = RollupStore()
+        self.snapshot_path = snapshot.DEFAULT_PATH
+        # settings.json, written behind the requests that change it
+        self.settings_store = SettingsStore()
+        self.snapshot_lock = threading.Lock()
+        self.last_snapshot = 0
+        # Per feed, held from finding its new entries until they are stored,
+        # so overlapping fetches of a feed do not both take them as new
+        self.store_locks = {}
+        self.store_locks_lock = threading.Lock()
+        # Set once the startup backfill is done; rollups wait for it
+        self.backfilled = threading.Event()
+        
+        # Results of the last analysis, kept unfiltered so stopword
+        # changes apply on read without refetching
+        self.last_articles_df = pd.DataFrame()
+        self.word_counts = Counter()
+        self.ranked_words = []
+        self.ngram_counts = {}
+        self.unique_words = HyperLogLog()
+        self.feed_unique_words = {}
+        self.last_feed_status = {}
         
         # Default RSS feeds organized by category
         self.default_feeds = {
@@ -105,41 +197,112 @@ class RSSWordAnalyzer:
             # International
             'Pravda Report': 'https://feeds.feedburner.com/engpravda'
         }
+        self.default_feed_categories = {
+            'News & Politics': [
+                'BBC News', 'Reuters', 'CNN', 'NYT Top Stories', 'NYT US News',
+                'Washington Post Politics', 'NPR Politics', 'Guardian US', 'ProPublica',
+                'Talking Points Memo', 'Naked Capitalism', 'The Real News Network',
+                'Texas Tribune'
+            ],
+            'Technology & Science': [
+                'TechCrunch', 'Hacker News', 'Ars Technica', 'The Register',
+                'Schneier on Security', 'Krebs on Security', 'NYT Technology', 'Slashdot',
+                'LA Times Technology', 'GitHub Blog', 'Scientific American',
+                'Scientific American Global', 'Scientific American Technology',
+                'The RISKS Digest'
+            ],
+            'Business & Finance': [
+                'CNBC US Top News', 'WSJ Technology', 'Yahoo Finance', 'Nasdaq Data Link Blog'
+            ],
+            'Special Interest': [
+                'Pluralistic (Cory Doctorow)', 'Dave Winer', 'Web3 is Going Just Great',
+                'Full Disclosure (Security)'
+            ],
+            'Reddit Communities': [
+                'r/ESP32', 'r/HomeAssistant', 'r/PythonPandas', 'r/AliExpressFinds'
+            ],
+            'International': ['Pravda Report']
+        }
         
         self.load_settings()
+        self.load_snapshot()
+        self.seen_entries.catch_up()
+        self.start_backfill()
     
     def load_settings(self):
         """Load settings from file if it exists"""
-        if os.path.exists('settings.json'):
-            try:
-                with open('settings.json', 'r') as f:
-                    settings = json.load(f)
-                    self.custom_stopwords = set(settings.get('custom_stopwords', []))
-                    self.selected_feeds = settings.get('selected_feeds', self.default_feeds.copy())
-            except:
-                self.selected_feeds = self.default_feeds.copy()
-        else:
-            self.selected_feeds = self.default_feeds.copy()
+        settings = self.settings_store.load()
+        self.selected_feeds = self.default_feeds.copy()
+        try:
+            self.set_custom_stopwords(settings.get('custom_stopwords', []))
+            self.set_custom_stop_phrases(settings.get('custom_stop_phrases', []))
+            self.selected_feeds = dict(settings.get('selected_feeds', self.default_feeds))
+            if 'tokenizer' in settings:
+                self.tokenizer = make_tokenizer(**settings['tokenizer'])
+                self.token_cache.clear()
+                self.feeds_data.clear()
+            if 'word_capacity' in settings:
+                self.word_capacity = settings['word_capacity']
+                self.feeds_data.clear()
+            self.watchlist.set_terms(settings.get('watchlist', []))
+            if 'ngram_sizes' in settings:
+                self.ngram_sizes = sorted(set(settings['ngram_sizes']))
+                self.feeds_data.clear()
+        except (TypeError, ValueError, AttributeError) as e:
+            # Settings read so far are kept; the rest stay at their defaults
+            print(f"Warning: invalid setting in {self.settings_store.path}: {e}")
+    
+    def set_custom_stopwords(self, stopwords):
+        """Replace the custom stopwords and rebuild the combined stopword set"""
+        self.custom_stopwords = set(stopwords)
+        self.all_stopwords = frozenset(self.default_stopwords | self.custom_stopwords)
+    
+    def set_custom_stop_phrases(self, phrases):
+        """Replace the custom stop phrases and rebuild the phrase automaton
+        
+        Cached token counts depend on the phrases, so they are dropped;
+        counts already made with the old phrases are left to
+        recount_cached_feeds().
+        """
+        self.custom_stop_phrases = [phrase for phrase in phrases if phrase.strip()]
+        self.phrase_filter = AhoCorasick(self.default_stop_phrases + self.custom_stop_phrases)
+        self.token_cache.clear()
     
     def save_settings(self):
-        """Save current settings to file"""
-        settings = {
+        """Save current settings; the file is written shortly after, off the
+        calling thread, together with any other changes made meanwhile"""
+        self.settings_store.update({
             'custom_stopwords': list(self.custom_stopwords),
-            'selected_feeds': self.selected_feeds
+            'custom_stop_phrases': self.custom_stop_phrases,
+            'selected_feeds': self.selected_feeds,
+            'tokenizer': self.tokenizer.settings(),
+            'ngram_sizes': self.ngram_sizes,
+            'word_capacity': self.word_capacity,
+            'watchlist': self.watchlist.terms
+        })
+    
+    def download_feed(self, feed_url, previous=None):
+        """Download a feed body, sending the validators of the previous fetch"""
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
-        with open('settings.json', 'w') as f:
-            json.dump(settings, f, indent=2)
+        if previous is not None:
+            if previous.etag:
+                headers['If-None-Match'] = previous.etag
+            if previous.last_modified:
+                headers['If-Modified-Since'] = previous.last_modified
+        
+        response = requests.get(feed_url, headers=headers, timeout=15)
+        if response.status_code != 304:
+            response.raise_for_status()
+        return response
     
-    def fetch_feed(self, feed_name, feed_url):
-        """Fetch and parse a single RSS feed"""
+    def fetch_feed(self, feed_name, feed_url, body=None, response_headers=None):
+        """Parse a single RSS feed, from an already downloaded body if given"""
         try:
-            # Set timeout and headers
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            
             # Parse the feed
-            feed = feedparser.parse(feed_url)
+            feed = feedparser.parse(feed_url if body is None else body,
+                                    response_headers=response_headers)
             
             if feed.bozo and hasattr(feed, 'bozo_exception'):
                 print(f"Warning: Issues parsing {feed_name}: {feed.bozo_exception}")
@@ -149,16 +312,20 @@ class RSSWordAnalyzer:
                 title = getattr(entry, 'title', '')
                 description = getattr(entry, 'description', '') or getattr(entry, 'summary', '')
                 link = getattr(entry, 'link', '')
+                guid = getattr(entry, 'id', '') or link
                 pub_date = getattr(entry, 'published', '')
+                published = parse_published(pub_date)
                 
-                # Clean HTML tags from description
-                description = re.sub('<[^<]+?>', '', description)
+                # Strip tags, script/style content and decode entities in one pass
+                description = html_to_text(description)
                 
                 articles.append({
+                    'guid': guid,
                     'title': title,
                     'description': description,
                     'link': link,
                     'published': pub_date,
+                    'published_ts': published.timestamp() if published else None,
                     'feed_name': feed_name
                 })
             
@@ -170,53 +337,502 @@ class RSSWordAnalyzer:
     
     def extract_words(self, text):
         """Extract words from text, converting to lowercase and removing punctuation"""
-        if not text:
-            return []
+        # Stop phrases are cut out in one automaton pass before tokenizing
+        if self.phrase_filter:
+            text = self.phrase_filter.remove(text)
+        # Tokenizer mode and length policy come from settings ('unicode' by default)
+        return self.tokenizer.tokenize(text)
+    
+    def count_words(self, text):
+        """Return a shared Counter of the words in text, cached by content hash"""
+        return self.token_cache.get_counts(text, self.extract_words)
+    
+    def count_articles(self, articles):
+        """Count words (and n-grams when enabled) in the titles and descriptions
+        
+        Returns (word_counts, ngram_counts) where ngram_counts maps each
+        n in ngram_sizes to a SpaceSaving summary. With n-grams enabled every
+        text is tokenized once and feeds both counters; its word counts go
+        into the token cache, so windows and backfills reuse them.
+        """
+        texts = [text for article in articles
+                 for text in (article['title'], article['description'])]
+        
+        if self.ngram_sizes:
+            word_counts = Counter()
+            ngram_counts = {n: SpaceSaving(NGRAM_CAPACITY) for n in self.ngram_sizes}
+            for text in texts:
+                tokens = self.extract_words(text)
+                counts = Counter(tokens)
+                self.token_cache.put(text, counts)
+                word_counts.update(counts)
+                for n, summary in ngram_counts.items():
+                    # Phrases may contain stopwords but not start or end with one
+                    summary.update(iter_ngrams(tokens, n, self.default_stopwords))
+            return word_counts, ngram_counts
+        
+        word_counts = Counter()
+        for text in texts:
+            word_counts.update(self.count_words(text))
+        return word_counts, {}
+    
+    def count_unique_words(self, articles, fetched_at):
+        """Per-day HyperLogLog counters of the distinct non-stopwords in articles
+        
+        Returns (all_days, daily) where daily only keeps the last
+        UNIQUE_WORD_DAYS UTC days. Undated articles count on the fetch day.
+        """
+        fetch_day = datetime.fromtimestamp(fetched_at, timezone.utc)
+        recent_days = set(recent_day_keys(UNIQUE_WORD_DAYS, now=fetch_day))
+        all_days = HyperLogLog()
+        daily = {}
+        for article in articles:
+            words = self.count_words(article['title']).keys() | self.count_words(article['description']).keys()
+            words -= self.default_stopwords
+            all_days.update(words)
+            published = article.get('published_ts')
+            day = day_key(datetime.fromtimestamp(published, timezone.utc) if published else fetch_day)
+            if day in recent_days:
+                daily.setdefault(day, HyperLogLog()).update(words)
+        return all_days, daily
+    
+    def count_article(self, article):
+        """Term counts of an article's title and description together"""
+        return self.count_words(article['title']) + self.count_words(article['description'])
+    
+    def article_counter(self, articles):
+        """count_article for a batch of articles
+        
+        Large batches (backfills) are tokenized up front across a process
+        pool, so the returned function only looks their counts up; small
+        ones use count_article and the token cache.
+        """
+        texts = {text for article in articles
+                 for text in (article['title'], article['description']) if text}
+        if len(texts) < PARALLEL_THRESHOLD:
+            return self.count_article
+        texts = list(texts)
+        counts = dict(zip(texts, count_each_parallel(texts, self.tokenizer.settings(),
+                                                     stop_phrases=self.phrase_filter.phrases)))
+        empty = Counter()
+        return lambda article: counts.get(article['title'], empty) + counts.get(article['description'], empty)
+    
+    def sync_term_matrix(self, feed_name, articles):
+        """Bring a feed's TF-IDF rows in line with its current articles"""
+        self.term_matrix.sync(feed_name, {entry_key(article): article for article in articles},
+                              self.count_article)
+    
+    def observe_new_entries(self, new_entries, burst_detector=None):
+        """Feed (hour, counts) of newly seen entries to the burst detector
+        
+        Entries of all feeds are sorted by hour first, so a backfill builds
+        each word's baseline in publication order.
+        """
+        burst_detector = self.burst_detector if burst_detector is None else burst_detector
+        for hour, counts in sorted(new_entries, key=lambda item: item[0]):
+            burst_detector.observe(hour, counts)
+    
+    def close_rollups(self):
+        """Append hourly and daily rollups for buckets that closed since the
+        last call, from the per-feed hourly counts held in memory
+        
+        Nothing is written before the startup backfill is done, since the
+        hours it restores would be rolled up incomplete.
+        """
+        if not self.backfilled.is_set():
+            return
+        now_hour = int(time.time() // HOUR)
+        written = self.rollups.close_buckets(
+            self.windowed_counts.feed_counts, self.windowed_counts.filled_hours(),
+            oldest_hour=now_hour - RING_HOURS + 1,
+            closed_before_hour=now_hour - ROLLUP_GRACE_HOURS
+        )
+        if written:
+            print(f"Wrote {written} rollup buckets")
+    
+    def snapshot_signature(self):
+        """Settings the cached counts depend on; a snapshot taken under
+        different ones is recounted from its articles when loaded"""
+        return {
+            'tokenizer': self.tokenizer.settings(),
+            'stop_phrases': self.phrase_filter.phrases,
+            'ngram_sizes': self.ngram_sizes,
+            'word_capacity': self.word_capacity
+        }
+    
+    def save_snapshot(self, force=False):
+        """Write the per-feed cache to the snapshot file, at most every
+        SNAPSHOT_INTERVAL seconds unless forced"""
+        if not force and time.time() - self.last_snapshot < SNAPSHOT_INTERVAL:
+            return
+        states = self.feeds_data.items()
+        if not states:
+            return
+        with self.snapshot_lock:
+            started = time.time()
+            try:
+                size = snapshot.write_snapshot(self.snapshot_path, states, self.snapshot_signature(),
+                                               seen_entries=self.seen_entries.to_bytes())
+            except OSError as e:
+                print(f"Warning: could not write snapshot: {e}")
+                return
+            self.last_snapshot = time.time()
+        print(f"Wrote snapshot of {len(states)} feeds ({size} bytes) in {self.last_snapshot - started:.2f}s")
+    
+    def load_snapshot(self):
+        """Restore the per-feed cache from the snapshot file and rebuild the
+        last analysis from it, so results are served before any fetch"""
+        if not os.path.exists(self.snapshot_path):
+            return
+        started = time.time()
+        try:
+            signature, states, seen_entries = snapshot.read_snapshot(self.snapshot_path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: ignoring unreadable snapshot {self.snapshot_path}: {e}")
+            return
+        if seen_entries is not None:
+            self.seen_entries.restore(seen_entries)
+        # JSON round-trips tuples as lists, so compare in the same form
+        recount = signature != json.loads(json.dumps(self.snapshot_signature()))
+        for feed_name, state in states:
+            if recount:
+                state = self.build_feed_state(
+                    state.url, state.articles, fetched_at=state.fetched_at,
+                    body_hash=state.body_hash, etag=state.etag,
+                    last_modified=state.last_modified, fetches=state.fetches,
+                    unchanged_fetches=state.unchanged_fetches
+                )
+            self.feeds_data.put(feed_name, state)
+        self.analyze_feeds(fetch=False)
+        self.last_snapshot = time.time()
+        print(f"Restored {len(states)} feeds from snapshot in {self.last_snapshot - started:.2f}s"
+              + (" (recounted: settings changed)" if recount else ""))
+    
+    def build_feed_state(self, feed_url, articles, fetched_at=None, **metadata):
+        """Count a feed's articles into a FeedState; metadata is passed through"""
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        word_counts, ngram_counts = self.count_articles(articles)
+        unique_words, daily_unique_words = self.count_unique_words(articles, fetched_at)
+        if self.word_capacity:
+            summary = SpaceSaving(self.word_capacity)
+            summary.update(word_counts)
+            word_counts = summary
+        return FeedState(
+            feed_url, articles, word_counts, ngram_counts=ngram_counts,
+            unique_words=unique_words, daily_unique_words=daily_unique_words,
+            fetched_at=fetched_at, **metadata
+        )
+    
+    def recount_cached_feeds(self):
+        """Recount every cached feed from its stored articles, without fetching"""
+        self.term_matrix.clear()
+        for feed_name, state in self.feeds_data.items():
+            self.sync_term_matrix(feed_name, state.articles)
+            self.feeds_data.put(feed_name, self.build_feed_state(
+                state.url, state.articles, fetched_at=state.fetched_at,
+                body_hash=state.body_hash, etag=state.etag,
+                last_modified=state.last_modified, fetches=state.fetches,
+                unchanged_fetches=state.unchanged_fetches
+            ))
+        self.backfill_from_store()
+    
+    def backfill_from_store(self):
+        """Rebuild the hourly windows and burst baselines of the selected feeds
+        from the logged articles of the last RING_HOURS hours
+        
+        They are built aside and then swapped in, so the current ones keep
+        being served meanwhile; entries of the cached feeds are synced into
+        the new ones after the swap, in case they were not logged yet.
+        """
+        if not len(self.article_log) and self.article_store.stats()['articles']:
+            self.seed_article_log()
+        windowed_counts = WindowedWordCounts()
+        burst_detector = BurstDetector()
+        by_feed = {}
+        logged = list(self.article_log.scan(since=time.time() - RING_HOURS * HOUR,
+                                            feed_names=self.selected_feeds))
+        for article in logged:
+            by_feed.setdefault(article['feed_name'], []).append(article)
+        count = self.article_counter(logged)
+        new_entries = []
+        for feed_name, articles in by_feed.items():
+            new_entries.extend(windowed_counts.sync(feed_name, articles, count))
+        self.observe_new_entries(new_entries, burst_detector)
+        
+        self.windowed_counts, self.burst_detector = windowed_counts, burst_detector
+        new_entries = []
+        for feed_name, state in self.feeds_data.items():
+            if feed_name in self.selected_feeds:
+                new_entries.extend(windowed_counts.sync(feed_name, state.articles, self.count_article))
+        self.observe_new_entries(new_entries, burst_detector)
+    
+    def start_backfill(self):
+        """Run the startup backfill on a daemon thread, so results from the
+        snapshot are served at once; windows and trends fill in when it is
+        done and backfilled is set"""
+        def run():
+            started = time.time()
+            self.backfill_from_store()
+            self.backfilled.set()
+            print(f"Backfilled hourly windows in {time.time() - started:.2f}s")
+            self.close_rollups()
         
-        # Convert to lowercase and extract words (letters only, minimum 3 characters)
-        words = re.findall(r'\b[a-zA-Z]{3,}\b', text.lower())
-        return words
+        threading.Thread(target=run, name='backfill', daemon=True).start()
+    
+    def seed_article_log(self):
+        """Copy the article store into an empty article log, oldest first"""
+        articles = self.article_store.articles()
+        articles.reverse()
+        for article in articles:
+            self.article_log.append(article['feed_name'], [article])
+        self.article_log.flush()
+        print(f"Copied {len(articles)} stored articles to the article log")
     
-    def analyze_feeds(self):
-        """Fetch all selected feeds and analyze word frequency"""
+    def store_lock(self, feed_name):
+        with self.store_locks_lock:
+            return self.store_locks.setdefault(feed_name, threading.Lock())
+    
+    def load_feed(self, feed_name, feed_url):
+        """Fetch a feed, count its words and cache the result
+        
+        When the server answers 304, or sends the same body as last time
+        (many ignore conditional GET), the previous articles and word counts
+        are reused without calling the parser or the tokenizer.
+        """
+        previous = self.feeds_data.get(feed_name)
+        if previous is not None and previous.url != feed_url:
+            previous = None
+        
+        try:
+            response = self.download_feed(feed_url, previous)
+        except Exception as e:
+            print(f"Error fetching {feed_name}: {str(e)}")
+            return FeedState(feed_url, [], Counter())
+        
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if previous is not None and response.status_code == 304:
+            state = previous.reuse(etag, last_modified)
+        else:
+            body_hash = hashlib.blake2b(response.content, digest_size=16).hexdigest()
+            if previous is not None and previous.body_hash == body_hash:
+                state = previous.reuse(etag, last_modified)
+            else:
+                self.body_store.add(feed_name, response.content)
+                articles = self.fetch_feed(feed_name, feed_url, body=response.content,
+                                           response_headers=response.headers)
+                # Only a changed body can hold new entries to store or to check
+                # for watched terms
+                if articles:
+                    recent = {entry_key(article) for article in previous.articles} if previous else ()
+                    with self.store_lock(feed_name):
+                        new = self.seen_entries.new_entries(feed_name, articles, recent_keys=recent)
+                        self.article_store.add_articles(feed_name, articles)
+                        self.seen_entries.catch_up()
+                    self.watchlist.scan(feed_name, new)
+                    self.article_log.append(feed_name, new)
+                state = self.build_feed_state(
+                    feed_url, articles,
+                    body_hash=body_hash, etag=etag, last_modified=last_modified,
+                    fetches=previous.fetches + 1 if previous else 1,
+                    unchanged_fetches=previous.unchanged_fetches if previous else 0
+                )
+        
+        # Empty results are usually fetch errors, so retry them next time
+        if state.articles:
+            self.feeds_data.put(feed_name, state)
+        return state
+    
+    def analyze_feeds(self, force_refresh=False, stem=False, window=None, fetch=True):
+        """Analyze word frequency of the selected feeds, fetching only new or stale ones
+        
+        With fetch=False nothing is downloaded: cached feeds are used however
+        old they are and uncached ones are left out.
+        """
         all_articles = []
+        word_counts = SpaceSaving(self.word_capacity) if self.word_capacity else Counter()
+        ngram_counts = {n: SpaceSaving(NGRAM_CAPACITY) for n in self.ngram_sizes}
+        unique_words = HyperLogLog()
+        feed_unique_words = {}
+        feed_status = {}
+        new_entries = []
+        fetched = False
         
-        # Fetch all feeds
         for feed_name, feed_url in self.selected_feeds.items():
-            print(f"Fetching {feed_name}...")
-            articles = self.fetch_feed(feed_name, feed_url)
-            all_articles.extend(articles)
+            if not fetch:
+                state = self.feeds_data.get(feed_name)
+                if state is None or state.url != feed_url:
+                    continue
+            else:
+                state = None if force_refresh else self.feeds_data.get_fresh(feed_name, feed_url)
+            cached = state is not None
+            if not cached:
+                fetched = True
+                print(f"Fetching {feed_name}...")
+                state = self.load_feed(feed_name, feed_url)
+            
+            # Merge per-feed counts; stopwords are applied when results are read
+            all_articles.extend(state.articles)
+            if isinstance(state.word_counts, SpaceSaving) and self.word_capacity:
+                word_counts.merge(state.word_counts)
+            else:
+                word_counts.update(state.word_counts)
+            for n, summary in ngram_counts.items():
+                if n in state.ngram_counts:
+                    summary.merge(state.ngram_counts[n])
+            if state.unique_words is not None:
+                unique_words.merge(state.unique_words)
+                feed_unique_words[feed_name] = state.unique_words
+            feed_status[feed_name] = dict(state.metadata(), cached=cached)
+            # Only entries that arrived or left since the last sync are touched
+            self.sync_term_matrix(feed_name, state.articles)
+            new_entries.extend(self.windowed_counts.sync(feed_name, state.articles, self.count_article))
+        
+        self.observe_new_entries(new_entries)
+        self.close_rollups()
+        self.article_log.flush()
+        self.feeds_data.evict_stale(keep=self.selected_feeds)
+        self.term_matrix.forget(keep=self.selected_feeds)
+        self.windowed_counts.forget(keep=self.selected_feeds)
         
-        if not all_articles:
-            return pd.DataFrame(), pd.DataFrame()
+        self.last_articles_df = pd.DataFrame(all_articles)
+        self.word_counts = word_counts
+        self.ranked_words = word_counts.most_common()
+        self.ngram_counts = ngram_counts
+        self.unique_words = unique_words
+        self.feed_unique_words = feed_unique_words
+        self.last_feed_status = feed_status
+        if fetched:
+            self.save_snapshot()
         
-        # Create DataFrame
-        df = pd.DataFrame(all_articles)
+        return self.get_results(stem=stem, window=window)
+    
+    def top_words(self, limit=200, stem=False, window=None):
+        """Most frequent words of the last analysis, skipping current stopwords
         
-        # Extract all words
-        all_words = []
-        for _, article in df.iterrows():
-            title_words = self.extract_words(article['title'])
-            desc_words = self.extract_words(article['description'])
-            all_words.extend(title_words + desc_words)
+        With stem=True words are grouped by Porter stem; each row is named
+        after its most frequent surface form and lists the forms behind it.
+        window ('1h', '24h' or '7d') counts only entries published in that
+        window, combining hourly buckets instead of rescanning articles.
+        """
+        stopwords = self.all_stopwords
+        ranked_words = self.ranked_words
+        if window:
+            ranked_words = self.windowed_counts.window(WINDOWS[window]).most_common()
+        if stem:
+            return pd.DataFrame([
+                {
+                    'word': forms[0][0],
+                    'frequency': total,
+                    'stem': stemmed,
+                    'forms': [{'word': word, 'frequency': count} for word, count in forms]
+                }
+                for stemmed, total, forms in self.stemmer.group(ranked_words, skip=stopwords)[:limit]
+            ])
         
-        # Filter out stopwords
-        all_stopwords = self.default_stopwords.union(self.custom_stopwords)
-        filtered_words = [word for word in all_words if word not in all_stopwords]
+        top = []
+        for word, count in ranked_words:
+            if word in stopwords:
+                continue
+            top.append({'word': word, 'frequency': count})
+            if len(top) >= limit:
+                break
+        return pd.DataFrame(top)
+    
+    def top_ngrams(self, limit=50):
+        """Most frequent phrases per n-gram size, skipping phrases that start
+        or end with a current stopword"""
+        stopwords = self.all_stopwords
+        results = {}
+        for n, summary in self.ngram_counts.items():
+            top = []
+            for phrase, count in summary.most_common():
+                words = phrase.split(' ')
+                if words[0] in stopwords or words[-1] in stopwords:
+                    continue
+                top.append({'phrase': phrase, 'frequency': count})
+                if len(top) >= limit:
+                    break
+            results[str(n)] = top
+        return results
+    
+    def unique_word_stats(self):
+        """Estimated distinct words overall, per feed and per recent window
         
-        # Count word frequency
-        word_counts = Counter(filtered_words)
+        Default stopwords are excluded when counting; custom stopwords are
+        not, since HyperLogLog counters cannot remove items.
+        """
+        windows = {}
+        for label, days in UNIQUE_WORD_WINDOWS.items():
+            window = HyperLogLog()
+            keys = recent_day_keys(days)
+            for feed_name in self.feed_unique_words:
+                state = self.feeds_data.get(feed_name)
+                if state is None:
+                    continue
+                for key in keys:
+                    if key in state.daily_unique_words:
+                        window.merge(state.daily_unique_words[key])
+            windows[label] = window.estimate()
         
-        # Create word frequency DataFrame
-        word_freq_df = pd.DataFrame([
-            {'word': word, 'frequency': count}
-            for word, count in word_counts.most_common(200)
-        ])
+        return {
+            'total': self.unique_words.estimate(),
+            'per_feed': {name: hll.estimate() for name, hll in self.feed_unique_words.items()},
+            'windows': windows,
+            'relative_error': round(self.unique_words.relative_error(), 4)
+        }
+    
+    def feed_category(self, feed_name):
+        """Category of a default feed; feeds added by the user are 'Custom'"""
+        for category, feed_names in self.default_feed_categories.items():
+            if feed_name in feed_names:
+                return category
+        return 'Custom'
+    
+    def distinctive_terms(self, by='feed', limit=25, min_df=2):
+        """TF-IDF distinctive terms of the analyzed feeds, per feed or per category
         
-        return df, word_freq_df
+        Current stopwords are skipped on read, like top_words.
+        """
+        groups = {}
+        for feed_name in self.last_feed_status:
+            group = feed_name if by == 'feed' else self.feed_category(feed_name)
+            groups.setdefault(group, []).append(feed_name)
+        return {
+            group: self.term_matrix.distinctive_terms(
+                feed_names, limit=limit, skip=self.all_stopwords, min_df=min_df
+            )
+            for group, feed_names in groups.items()
+        }
+    
+    def trending_words(self, limit=25, min_count=3):
+        """Words surging in the latest hour against their EWMA baseline,
+        skipping current stopwords"""
+        return self.burst_detector.trending(
+            int(time.time() // 3600), limit=limit, min_count=min_count, skip=self.all_stopwords
+        )
+    
+    def counting_metadata(self):
+        """How word frequencies were counted and how far they may be off"""
+        if isinstance(self.word_counts, SpaceSaving):
+            return {
+                'mode': 'approximate',
+                'capacity': self.word_counts.capacity,
+                'total_words': self.word_counts.total,
+                'error_bound': round(self.word_counts.error_bound(), 2)
+            }
+        return {'mode': 'exact', 'total_words': sum(self.word_counts.values())}
+    
+    def get_results(self, stem=False, window=None):
+        """Articles and word frequency of the last analysis, without refetching"""
+        return self.last_articles_df, self.top_words(stem=stem, window=window)
 
 # Initialize the analyzer
 analyzer = RSSWordAnalyzer()
+atexit.register(analyzer.save_snapshot, force=True)
+atexit.register(analyzer.article_log.flush)
+atexit.register(analyzer.settings_store.flush)
+analyzer.article_log.start_compactor()
 
 @app.route('/')
 def index():
@@ -252,23 +868,256 @@ def update_stopwords():
     """Update custom stopwords"""
     data = request.json
     if 'stopwords' in data:
-        analyzer.custom_stopwords = set(data['stopwords'])
+        analyzer.set_custom_stopwords(data['stopwords'])
+        analyzer.save_settings()
+    return jsonify({'status': 'success'})
+
+def arg_enabled(name):
+    """True when a query string flag such as ?stem=1 is set"""
+    return request.args.get(name, '').lower() in ('1', 'true', 'yes')
+
+def window_arg():
+    """The ?window= parameter (1h, 24h or 7d), None when absent"""
+    window = request.args.get('window') or None
+    if window is not None and window not in WINDOWS:
+        raise ValueError(f"window must be one of {', '.join(WINDOWS)}")
+    return window
+
+def page_args(default_limit):
+    """?offset= and ?limit= query parameters; limit is capped at 500"""
+    offset = max(0, int(request.args.get('offset', 0)))
+    limit = min(500, max(1, int(request.args.get('limit', default_limit))))
+    return offset, limit
+
+def build_results_response(articles_df, word_freq_df, window=None):
+    """JSON payload shared by /api/analyze and /api/results"""
+    unique_words = analyzer.unique_word_stats()
+    return jsonify({
+        'articles': articles_df.to_dict('records') if not articles_df.empty else [],
+        'word_frequency': word_freq_df.to_dict('records') if not word_freq_df.empty else [],
+        'ngram_frequency': analyzer.top_ngrams(),
+        'word_counting': analyzer.counting_metadata(),
+        'stemmer': analyzer.stemmer.stats(),
+        'total_articles': len(articles_df),
+        'total_unique_words': unique_words['total'],
+        'unique_words': unique_words,
+        'feeds': analyzer.last_feed_status,
+        'window': window,
+        'token_cache': analyzer.token_cache.stats(),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/stopphrases')
+def get_stop_phrases():
+    """Get current stop phrases"""
+    return jsonify({
+        'custom_stop_phrases': analyzer.custom_stop_phrases,
+        'default_stop_phrases': analyzer.default_stop_phrases
+    })
+
+@app.route('/api/stopphrases', methods=['POST'])
+def update_stop_phrases():
+    """Update custom stop phrases; cached feeds are recounted and the results
+    rebuilt from them without refetching"""
+    data = request.json
+    if 'stop_phrases' in data:
+        analyzer.set_custom_stop_phrases(data['stop_phrases'])
+        analyzer.recount_cached_feeds()
+        analyzer.analyze_feeds(fetch=False)
         analyzer.save_settings()
     return jsonify({'status': 'success'})
 
+@app.route('/api/watchlist')
+def get_watchlist():
+    """Get watched terms"""
+    return jsonify({'terms': analyzer.watchlist.terms})
+
+@app.route('/api/watchlist', methods=['POST'])
+def update_watchlist():
+    """Replace watched terms; only entries downloaded from now on are scanned"""
+    data = request.json
+    if 'terms' in data:
+        analyzer.watchlist.set_terms(data['terms'])
+        analyzer.save_settings()
+    return jsonify({'status': 'success', 'terms': analyzer.watchlist.terms})
+
+@app.route('/api/alerts')
+def alerts():
+    """Watchlist matches, newest first; ?since=<id> returns only later alerts,
+    ?term= filters to one term and ?limit= caps the count (default 100)"""
+    try:
+        since = int(request.args.get('since', 0))
+        limit = int(request.args.get('limit', 100))
+    except ValueError:
+        return jsonify({'error': 'since and limit must be integers'}), 400
+    term = request.args.get('term')
+    matches = analyzer.watchlist.recent(
+        since=since, limit=limit, term=normalize_phrase(term) if term else None
+    )
+    return jsonify({
+        'alerts': matches,
+        'terms': analyzer.watchlist.terms,
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/tfidf')
+def tfidf():
+    """Distinctive terms of the last analysis by TF-IDF; ?by=feed (default) or
+    ?by=category, ?limit= terms per group (default 25), ?min_df= minimum
+    number of articles a term must appear in (default 2)"""
+    by = request.args.get('by', 'feed')
+    if by not in ('feed', 'category'):
+        return jsonify({'error': "by must be 'feed' or 'category'"}), 400
+    try:
+        limit = int(request.args.get('limit', 25))
+        min_df = int(request.args.get('min_df', 2))
+    except ValueError:
+        return jsonify({'error': 'limit and min_df must be integers'}), 400
+    return jsonify({
+        'by': by,
+        'distinctive_terms': analyzer.distinctive_terms(by=by, limit=limit, min_df=min_df),
+        'matrix': analyzer.term_matrix.stats(),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/trending')
+def trending():
+    """Words spiking in the latest hour compared with their baseline, from the
+    state kept by the last analyses; ?limit= (default 25) and ?min_count=
+    (default 3) mentions in the hour"""
+    try:
+        limit = int(request.args.get('limit', 25))
+        min_count = int(request.args.get('min_count', 3))
+    except ValueError:
+        return jsonify({'error': 'limit and min_count must be integers'}), 400
+    latest_hour = analyzer.burst_detector.latest_hour
+    return jsonify({
+        'trending': analyzer.trending_words(limit=limit, min_count=min_count),
+        'hour': datetime.fromtimestamp(latest_hour * 3600, timezone.utc).isoformat()
+                if latest_hour is not None else None,
+        'detector': analyzer.burst_detector.stats(),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/articles')
+def stored_articles():
+    """Drill down into stored articles; ?q= full-text search over titles and
+    descriptions (best match first), otherwise newest first. ?feed= limits
+    to one feed, ?days= to recently published ones, ?limit= (default 50,
+    at most 500) and ?offset= page through the results"""
+    try:
+        offset, limit = page_args(50)
+        days = float(request.args['days']) if request.args.get('days') else None
+    except ValueError:
+        return jsonify({'error': 'limit, offset and days must be numbers'}), 400
+    feed = request.args.get('feed')
+    feed_names = [feed] if feed else None
+    query = request.args.get('q', '').strip()
+    if query:
+        matches = analyzer.article_store.search(query, feed_names=feed_names,
+                                                limit=limit, offset=offset)
+    else:
+        since = time.time() - days * 86400 if days is not None else None
+        matches = analyzer.article_store.articles(feed_names=feed_names, since=since,
+                                                  limit=limit, offset=offset)
+    return jsonify({
+        'articles': matches,
+        'store': analyzer.article_store.stats(),
+        'log': analyzer.article_log.stats(),
+        'seen_entries': analyzer.seen_entries.stats(),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/bodies')
+def feed_bodies():
+    """Size, compression ratio and decode speed of the raw feed body archive;
+    ?feed= lists that feed's stored bodies"""
+    response = {'bodies': analyzer.body_store.stats()}
+    feed = request.args.get('feed')
+    if feed:
+        response['versions'] = [
+            {'fetched_at': fetched_at, 'bytes': size, 'stored_bytes': stored}
+            for fetched_at, size, stored in analyzer.body_store.versions(feed)
+        ]
+    return jsonify(response)
+
+def parse_time_arg(name, default):
+    """An ISO 8601 date or datetime query parameter as epoch seconds (UTC
+    unless an offset is given)"""
+    value = request.args.get(name)
+    if not value:
+        return default
+    moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+@app.route('/api/history')
+def history():
+    """A word's count per closed hour or day from the rollups, without
+    touching articles; ?word= (required), ?from= and ?to= ISO dates
+    (default the last 30 days, or 7 for hours), ?granularity=day|hour,
+    ?feed= for one feed"""
+    word = request.args.get('word', '').strip().lower()
+    granularity = request.args.get('granularity', 'day')
+    if not word:
+        return jsonify({'error': 'word is required'}), 400
+    if granularity not in GRANULARITIES:
+        return jsonify({'error': f"granularity must be one of {', '.join(GRANULARITIES)}"}), 400
+    try:
+        end = parse_time_arg('to', time.time())
+        start = parse_time_arg('from', end - (30 if granularity == 'day' else 7) * 86400)
+    except ValueError:
+        return jsonify({'error': 'from and to must be ISO 8601 dates'}), 400
+    
+    # Align to bucket starts so a bucket is included when the range touches it
+    size = GRANULARITIES[granularity]
+    series = analyzer.rollups.history(word, start // size * size, end, granularity,
+                                      feed_name=request.args.get('feed'))
+    return jsonify({
+        'word': word,
+        'granularity': granularity,
+        'from': datetime.fromtimestamp(start, timezone.utc).isoformat(),
+        'to': datetime.fromtimestamp(end, timezone.utc).isoformat(),
+        'series': [
+            {
+                'bucket': datetime.fromtimestamp(bucket, timezone.utc).isoformat(),
+                'count': sum(counts.values()),
+                'feeds': counts
+            }
+            for bucket, counts in series
+        ],
+        'total': sum(sum(counts.values()) for _, counts in series),
+        'rollups': analyzer.rollups.stats()
+    })
+
 @app.route('/api/analyze')
 def analyze():
-    """Perform analysis and return results"""
+    """Perform analysis and return results; ?refresh=1 refetches every feed,
+    ?stem=1 groups words by stem, ?window=1h|24h|7d counts only entries
+    published in that window"""
     try:
-        articles_df, word_freq_df = analyzer.analyze_feeds()
-        
-        return jsonify({
-            'articles': articles_df.to_dict('records') if not articles_df.empty else [],
-            'word_frequency': word_freq_df.to_dict('records') if not word_freq_df.empty else [],
-            'total_articles': len(articles_df),
-            'total_unique_words': len(word_freq_df),
-            'timestamp': datetime.now().isoformat()
-        })
+        window = window_arg()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        articles_df, word_freq_df = analyzer.analyze_feeds(
+            force_refresh=arg_enabled('refresh'), stem=arg_enabled('stem'), window=window
+        )
+        return build_results_response(articles_df, word_freq_df, window=window)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/results')
+def results():
+    """Return the last analysis with the current stopwords applied, without refetching"""
+    try:
+        window = window_arg()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        articles_df, word_freq_df = analyzer.get_results(stem=arg_enabled('stem'), window=window)
+        return build_results_response(articles_df, word_freq_df, window=window)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -280,4 +1129,6 @@ if __name__ == '__main__':
     print("📊 Open your browser to: http://localhost:5000")
     print("⏹️  Press Ctrl+C to stop the server")
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    # No reloader: it would run a second process that builds its own
+    # analyzer, compacts the same article log and writes its own snapshot
+    app.run(debug=True, host='0.0.0.0', port=5000, use_reloader=False)
\ No newline at end of file
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Seen-entry tracking for the RSS Word Frequency Analyzer
+A scalable Bloom filter of every stored (feed, GUID) pair answers most
+"processed before?" checks in memory; only entries it reports as maybe
+seen are confirmed against the article store.
+"""
+
+import struct
+import threading
+
+from feed_cache import entry_key
+from sketches import ScalableBloomFilter
+
+_THROUGH_ID = struct.Struct('<Q')
+
+
+def _item(feed_name, guid):
+    return feed_name + '\0' + guid
+
+
+class SeenEntries:
+    """Entries of the article store, as a Bloom filter kept in step with it
+
+    The filter holds every row up to through_id; catch_up() adds rows
+    stored since. It is serialized with the analyzer snapshot, so a
+    restart only reads the rows added after the snapshot was taken.
+    """
+
+    def __init__(self, store, error_rate=0.001):
+        self.store = store
+        self.error_rate = error_rate
+        self.filter = ScalableBloomFilter(error_rate=error_rate)
+        self.through_id = 0
+        self._lock = threading.Lock()
+        self.checks = 0
+        self.exact_lookups = 0
+        self.false_positives = 0
+
+    def catch_up(self):
+        """Add the store's rows not yet in the filter; returns how many"""
+        with self._lock:
+            added = 0
+            for row_id, feed_name, guid in self.store.entry_keys(self.through_id):
+                self.filter.add(_item(feed_name, guid))
+                self.through_id = row_id
+                added += 1
+            return added
+
+    def new_entries(self, feed_name, articles, recent_keys=()):
+        """The articles of feed_name not stored before
+
+        Call it before the articles are stored. Entries in recent_keys (the
+        feed's previous download, which most of a fetch repeats) are known
+        seen, and entries the filter has never seen are new for certain;
+        only the rest are looked up in the store, since a few of them are
+        false positives.
+        """
+        keys = [entry_key(article) for article in articles]
+        with self._lock:
+            self.checks += len(keys)
+            maybe_seen = [key for key in keys
+                          if key not in recent_keys and _item(feed_name, key) in self.filter]
+        known = set()
+        if maybe_seen:
+            known = self.store.known_guids(feed_name, maybe_seen)
+            with self._lock:
+                self.exact_lookups += len(maybe_seen)
+                self.false_positives += len(maybe_seen) - len(known)
+        return [article for article, key in zip(articles, keys)
+                if key not in known and key not in recent_keys]
+
+    def to_bytes(self):
+        with self._lock:
+            return _THROUGH_ID.pack(self.through_id) + self.filter.to_bytes()
+
+    def restore(self, data):
+        """Replace the filter with one serialized by to_bytes"""
+        (through_id,) = _THROUGH_ID.unpack_from(data)
+        restored = ScalableBloomFilter.from_bytes(data[_THROUGH_ID.size:])
+        with self._lock:
+            self.filter = restored
+            self.through_id = through_id
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self.filter),
+                'filters': len(self.filter.filters),
+                'memory_bytes': self.filter.memory_bytes(),
+                'expected_false_positive_rate': round(self.filter.false_positive_rate(), 6),
+                'checks': self.checks,
+                'answered_in_memory': self.checks - self.exact_lookups,
+                'exact_lookups': self.exact_lookups,
+                'false_positives': self.false_positives
+            }
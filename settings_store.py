@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Write-behind settings persistence for the RSS Word Frequency Analyzer
+Settings live in memory; changes are coalesced for a short delay and then
+written off the request thread, atomically, by replacing settings.json
+with a fully written temporary file.
+"""
+
+import json
+import os
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: os.replace is still atomic, writers are not serialized
+    fcntl = None
+
+DEFAULT_PATH = 'settings.json'
+WRITE_DELAY = 0.5  # seconds a change may wait for others to be written with it
+
+
+class SettingsStore:
+    """The settings dict, written to path at most WRITE_DELAY after a change
+
+    Writers in other worker processes are serialized with an advisory
+    lock on path + '.lock'. Under it the file is read again and only the
+    keys changed here since the last write are replaced, so workers
+    changing different settings keep each other's changes; the whole file
+    is then replaced, so a reader never sees a partial one.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, delay=WRITE_DELAY):
+        self.path = path
+        self.delay = delay
+        self._lock = threading.Lock()  # guards _settings, _version and _timer
+        self._write_lock = threading.Lock()
+        self._settings = {}
+        self._changed = set()  # keys updated since the last write
+        self._version = 0  # bumped by every update
+        self._written_version = 0
+        self._timer = None
+        self.writes = 0
+
+    def load(self):
+        """Read settings from path; {} if it is missing or unreadable"""
+        settings = self._read()
+        with self._lock:
+            self._settings = settings
+        return dict(settings)
+
+    def _read(self):
+        try:
+            with open(self.path, 'r') as f:
+                settings = json.load(f)
+            if not isinstance(settings, dict):
+                raise ValueError('settings must be a JSON object')
+        except FileNotFoundError:
+            settings = {}
+        except (OSError, ValueError) as e:
+            print(f"Warning: ignoring unreadable {self.path}: {e}")
+            settings = {}
+        return settings
+
+    def get(self):
+        with self._lock:
+            return dict(self._settings)
+
+    def update(self, settings):
+        """Replace the settings and schedule a write; returns immediately"""
+        with self._lock:
+            for key in settings.keys() | self._settings.keys():
+                if key not in settings or key not in self._settings or \
+                        settings[key] != self._settings[key]:
+                    self._changed.add(key)
+            self._settings = dict(settings)
+            self._version += 1
+            # The first change starts the timer; later ones ride along with it
+            if self._timer is None:
+                self._timer = threading.Timer(self.delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Write pending changes now; returns True if anything was written"""
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if self._version == self._written_version:
+                    return False
+                version = self._version
+                settings = dict(self._settings)
+                changed, self._changed = self._changed, set()
+            try:
+                self._write(settings, changed)
+            except OSError as e:
+                with self._lock:
+                    self._changed |= changed
+                print(f"Warning: could not write {self.path}: {e}")
+                return False
+            self._written_version = version
+            self.writes += 1
+            return True
+
+    def _write(self, settings, changed):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with open(self.path + '.lock', 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            merged = self._read()
+            for key in changed:
+                if key in settings:
+                    merged[key] = settings[key]
+                else:
+                    merged.pop(key, None)
+            data = json.dumps(merged, indent=2)
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.settings-', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, self.path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Fixed-memory summaries for the RSS Word Frequency Analyzer
+Approximate structures whose size does not grow with the corpus.
+"""
+
+import hashlib
+import heapq
+import math
+import struct
+
+
+class SpaceSaving:
+    """Space-Saving heavy hitters (Metwally et al.) over at most `capacity` items
+
+    Every tracked item keeps an estimated count and the maximum amount by
+    which that estimate may overcount. For a stream of N total increments,
+    each estimate is at most N / capacity above the true count, and any
+    item whose true count exceeds N / capacity is guaranteed to be tracked.
+    """
+
+    def __init__(self, capacity=1000):
+        if capacity < 1:
+            raise ValueError('capacity must be at least 1')
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.total = 0
+        # Lazy min-heap of (count, item); stale entries are skipped on pop
+        self._heap = []
+
+    @classmethod
+    def from_counts(cls, capacity, counts, errors, total):
+        """Rebuild a summary from its tracked counts and errors (snapshots)"""
+        summary = cls(capacity)
+        summary.counts = dict(counts)
+        summary.errors = dict(errors)
+        summary.total = total
+        summary._heap = [(c, i) for i, c in summary.counts.items()]
+        heapq.heapify(summary._heap)
+        return summary
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __contains__(self, item):
+        return item in self.counts
+
+    def _push(self, item, count):
+        heapq.heappush(self._heap, (count, item))
+        if len(self._heap) > 4 * self.capacity + 64:
+            self._heap = [(c, i) for i, c in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self):
+        while True:
+            count, item = heapq.heappop(self._heap)
+            if self.counts.get(item) == count:
+                return item, count
+
+    def add(self, item, count=1):
+        """Record `count` occurrences of item"""
+        self.total += count
+        counts = self.counts
+        if item in counts:
+            counts[item] += count
+        elif len(counts) < self.capacity:
+            counts[item] = count
+            self.errors[item] = 0
+        else:
+            # Replace the minimum; the newcomer inherits its count as error
+            evicted, floor = self._pop_min()
+            del counts[evicted]
+            del self.errors[evicted]
+            counts[item] = floor + count
+            self.errors[item] = floor
+        self._push(item, counts[item])
+
+    def update(self, items):
+        """Record one occurrence of each item, or item -> count pairs of a mapping"""
+        if hasattr(items, 'items'):
+            for item, count in items.items():
+                self.add(item, count)
+        else:
+            for item in items:
+                self.add(item)
+
+    def merge(self, other):
+        """Fold another summary into this one (mergeable summaries)
+
+        Items missing from a full side may have had up to that side's
+        minimum count there, so it is added to both their count and their
+        error; estimates then still never undercount, and overcount by at
+        most the combined N / capacity. The result is truncated to capacity.
+        """
+        self_floor = self.min_count() if len(self.counts) >= self.capacity else 0
+        other_floor = other.min_count() if len(other.counts) >= other.capacity else 0
+        merged = {}
+        for item in self.counts.keys() | other.counts.keys():
+            count = self.counts.get(item, self_floor) + other.counts.get(item, other_floor)
+            error = self.errors.get(item, self_floor) + other.errors.get(item, other_floor)
+            merged[item] = (count, error)
+        keep = heapq.nlargest(self.capacity, merged.items(), key=lambda kv: kv[1][0])
+        self.counts = {item: count for item, (count, _) in keep}
+        self.errors = {item: error for item, (_, error) in keep}
+        self.total += other.total
+        self._heap = [(c, i) for i, c in self.counts.items()]
+        heapq.heapify(self._heap)
+        return self
+
+    def min_count(self):
+        """Smallest tracked count, 0 when empty"""
+        return min(self.counts.values()) if self.counts else 0
+
+    def error_bound(self):
+        """Upper bound on the overcount of any estimate (N / capacity)"""
+        return self.total / self.capacity
+
+    def most_common(self, n=None, exclude=None):
+        """(item, estimated count) pairs, highest first, skipping items in exclude"""
+        items = self.counts.items()
+        if exclude:
+            items = [(item, count) for item, count in items if item not in exclude]
+        if n is None:
+            return sorted(items, key=lambda kv: kv[1], reverse=True)
+        return heapq.nlargest(n, items, key=lambda kv: kv[1])
+
+    def guaranteed_count(self, item):
+        """Lower bound on the true count of item"""
+        return self.counts.get(item, 0) - self.errors.get(item, 0)
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter (Flajolet et al.) with 2**precision registers
+
+    The standard error of the estimate is about 1.04 / sqrt(2**precision),
+    1.6% at the default precision of 12 (4 KB). Two counters with the same
+    precision merge by taking the register-wise maximum; the result estimates
+    the union, so per-feed and per-worker counters combine losslessly.
+    """
+
+    def __init__(self, precision=12, registers=None):
+        if not 4 <= precision <= 16:
+            raise ValueError('precision must be between 4 and 16')
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.size)
+        if len(self.registers) != self.size:
+            raise ValueError('register array does not match precision')
+
+    @staticmethod
+    def _hash(item):
+        return int.from_bytes(
+            hashlib.blake2b(item.encode('utf-8', 'surrogatepass'), digest_size=8).digest(), 'big'
+        )
+
+    def add(self, item):
+        value = self._hash(item)
+        index = value >> (64 - self.precision)
+        rest = value & ((1 << (64 - self.precision)) - 1)
+        # Position of the leftmost 1-bit in the remaining bits
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, items):
+        for item in items:
+            self.add(item)
+
+    def merge(self, other):
+        """Fold another counter of the same precision into this one"""
+        if other.precision != self.precision:
+            raise ValueError('cannot merge HyperLogLog counters of different precision')
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def copy(self):
+        return HyperLogLog(self.precision, self.registers)
+
+    def estimate(self):
+        """Estimated number of distinct items added"""
+        m = self.size
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        harmonic = math.fsum(2.0 ** -r for r in self.registers)
+        estimate = alpha * m * m / harmonic
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction: linear counting
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def relative_error(self):
+        return 1.04 / math.sqrt(self.size)
+
+    def to_bytes(self):
+        """Compact serialization for workers and snapshots"""
+        return bytes([self.precision]) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls(data[0], data[1:])
+
+
+class BloomFilter:
+    """Bloom filter sized for `capacity` items at false-positive rate `error_rate`
+
+    Membership tests never miss an added item and wrongly report an unseen
+    one with probability about error_rate while at most capacity items
+    have been added. The k bit positions come from one 128-bit hash split
+    in two (Kirsch and Mitzenmacher).
+    """
+
+    _HEADER = struct.Struct('<QQd')
+
+    def __init__(self, capacity, error_rate, bits=None, count=0):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray(bits) if bits is not None else bytearray((self.size + 7) // 8)
+        self.count = count
+
+    @staticmethod
+    def hash(item):
+        """The two 64-bit halves every position of item is derived from"""
+        digest = hashlib.blake2b(item.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+    def _positions(self, hashed):
+        h1, h2 = hashed
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hashes)]
+
+    def __contains__(self, item):
+        return self.contains_hash(self.hash(item))
+
+    def contains_hash(self, hashed):
+        # Stops at the first clear bit, usually the first or second probe
+        h1, h2 = hashed
+        size, bits = self.size, self.bits
+        for i in range(self.hashes):
+            p = (h1 + i * h2) % size
+            if not bits[p >> 3] & (1 << (p & 7)):
+                return False
+        return True
+
+    def add(self, item):
+        """Add item; False if it may already have been present"""
+        return self.add_hash(self.hash(item))
+
+    def add_hash(self, hashed):
+        bits = self.bits
+        added = False
+        for p in self._positions(hashed):
+            mask = 1 << (p & 7)
+            if not bits[p >> 3] & mask:
+                bits[p >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    def to_bytes(self):
+        return self._HEADER.pack(self.capacity, self.count, self.error_rate) + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, data):
+        capacity, count, error_rate = cls._HEADER.unpack_from(data)
+        return cls(capacity, error_rate, data[cls._HEADER.size:], count)
+
+
+class ScalableBloomFilter:
+    """Bloom filter that grows by adding filters (Almeida et al.)
+
+    When the newest filter is full a new one is added with `growth` times
+    the capacity and `tightening` times the error rate. The rates form a
+    geometric series summing to error_rate, so the overall false-positive
+    rate stays below it however many items are added, while memory grows
+    with the item count.
+    """
+
+    _HEADER = struct.Struct('<QddI')
+    _LENGTH = struct.Struct('<Q')
+
+    def __init__(self, initial_capacity=100000, error_rate=0.001, growth=2, tightening=0.5):
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.growth = growth
+        self.tightening = tightening
+        self.filters = []
+
+    def __contains__(self, item):
+        hashed = BloomFilter.hash(item)
+        return any(bloom.contains_hash(hashed) for bloom in reversed(self.filters))
+
+    def __len__(self):
+        """Approximate number of distinct items added"""
+        return sum(bloom.count for bloom in self.filters)
+
+    def add(self, item):
+        """Add item; False if it may already have been present"""
+        hashed = BloomFilter.hash(item)
+        if any(bloom.contains_hash(hashed) for bloom in reversed(self.filters)):
+            return False
+        if not self.filters or self.filters[-1].count >= self.filters[-1].capacity:
+            n = len(self.filters)
+            self.filters.append(BloomFilter(
+                self.initial_capacity * self.growth ** n,
+                self.error_rate * (1 - self.tightening) * self.tightening ** n
+            ))
+        return self.filters[-1].add_hash(hashed)
+
+    def update(self, items):
+        for item in items:
+            self.add(item)
+
+    def false_positive_rate(self):
+        """Expected false-positive rate at the current fill"""
+        clear = 1.0
+        for bloom in self.filters:
+            clear *= 1 - (1 - math.exp(-bloom.hashes * bloom.count / bloom.size)) ** bloom.hashes
+        return 1 - clear
+
+    def memory_bytes(self):
+        return sum(len(bloom.bits) for bloom in self.filters)
+
+    def to_bytes(self):
+        parts = [self._HEADER.pack(self.initial_capacity, self.error_rate,
+                                   self.tightening, self.growth)]
+        for bloom in self.filters:
+            data = bloom.to_bytes()
+            parts.append(self._LENGTH.pack(len(data)))
+            parts.append(data)
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        initial_capacity, error_rate, tightening, growth = cls._HEADER.unpack_from(data)
+        sbf = cls(initial_capacity, error_rate, growth, tightening)
+        offset = cls._HEADER.size
+        while offset < len(data):
+            (length,) = cls._LENGTH.unpack_from(data, offset)
+            offset += cls._LENGTH.size
+            sbf.filters.append(BloomFilter.from_bytes(data[offset:offset + length]))
+            offset += length
+        return sbf
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Binary snapshots of the per-feed cache for the RSS Word Frequency Analyzer
+Lets a restarted app serve warm results from the last known feed states
+instead of refetching every feed first.
+"""
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+import zlib
+from array import array
+from collections import Counter
+
+from feed_cache import FeedState
+from sketches import HyperLogLog, SpaceSaving
+
+DEFAULT_PATH = 'analyzer.snapshot'
+MAGIC = b'RWSNAP01'
+
+# Layout: MAGIC, uint32 header length, JSON header, then a data region of
+# blobs the header points at as [offset, length] pairs relative to its
+# start. One vocabulary (NUL-joined words and phrases) is shared by every
+# counter, which are stored as uint32 arrays of word ids and counts
+# (plus errors for Space-Saving summaries). Articles are zlib-compressed
+# JSON, HyperLogLog counters their raw registers, and the optional
+# seen-entries blob is stored as given.
+_HEADER_LENGTH = struct.Struct('<I')
+
+
+class _Writer:
+    def __init__(self):
+        self.blobs = []
+        self.size = 0
+        self.vocabulary = {}
+
+    def add(self, data):
+        self.blobs.append(data)
+        self.size += len(data)
+        return [self.size - len(data), len(data)]
+
+    def word_ids(self, words):
+        vocabulary = self.vocabulary
+        return array('I', (vocabulary.setdefault(word, len(vocabulary)) for word in words))
+
+    def counts(self, counts):
+        if isinstance(counts, SpaceSaving):
+            items = list(counts.counts.items())
+            return {
+                'kind': 'space_saving',
+                'capacity': counts.capacity,
+                'total': counts.total,
+                'words': self.add(self.word_ids(item for item, _ in items).tobytes()),
+                'counts': self.add(array('I', (count for _, count in items)).tobytes()),
+                'errors': self.add(array('I', (counts.errors[item] for item, _ in items)).tobytes())
+            }
+        return {
+            'kind': 'counter',
+            'words': self.add(self.word_ids(counts.keys()).tobytes()),
+            'counts': self.add(array('I', counts.values()).tobytes())
+        }
+
+
+def write_snapshot(path, feed_states, signature, seen_entries=None):
+    """Write (feed name, FeedState) pairs to path atomically
+
+    signature describes the settings the counts depend on (tokenizer,
+    stop phrases, ...); read_snapshot hands it back so the caller can tell
+    whether the counts are still valid. seen_entries is an optional
+    serialized seen-entry filter.
+    """
+    writer = _Writer()
+    feeds = []
+    for feed_name, state in feed_states:
+        feed = {
+            'name': feed_name,
+            'url': state.url,
+            'fetched_at': state.fetched_at,
+            'body_hash': state.body_hash,
+            'etag': state.etag,
+            'last_modified': state.last_modified,
+            'fetches': state.fetches,
+            'unchanged_fetches': state.unchanged_fetches,
+            'articles': writer.add(zlib.compress(json.dumps(state.articles).encode('utf-8'), 6)),
+            'word_counts': writer.counts(state.word_counts),
+            'ngram_counts': {str(n): writer.counts(summary)
+                             for n, summary in state.ngram_counts.items()},
+            'daily_unique_words': {day: writer.add(hll.to_bytes())
+                                   for day, hll in state.daily_unique_words.items()}
+        }
+        if state.unique_words is not None:
+            feed['unique_words'] = writer.add(state.unique_words.to_bytes())
+        feeds.append(feed)
+
+    words = sorted(writer.vocabulary, key=writer.vocabulary.get)
+    header = {
+        'signature': signature,
+        'vocabulary': writer.add('\0'.join(words).encode('utf-8')),
+        'feeds': feeds
+    }
+    if seen_entries is not None:
+        header['seen_entries'] = writer.add(seen_entries)
+    header = json.dumps(header).encode('utf-8')
+
+    # A writer killed part way leaves only its own temporary file behind
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                     prefix='.snapshot-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC + _HEADER_LENGTH.pack(len(header)) + header)
+            for blob in writer.blobs:
+                f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return len(MAGIC) + _HEADER_LENGTH.size + len(header) + writer.size
+
+
+def _uint32s(view, span):
+    values = array('I')
+    values.frombytes(view[span[0]:span[0] + span[1]])
+    return values
+
+
+def _read_counts(view, info, words):
+    ids = _uint32s(view, info['words'])
+    counts = _uint32s(view, info['counts'])
+    if info['kind'] == 'space_saving':
+        errors = _uint32s(view, info['errors'])
+        return SpaceSaving.from_counts(
+            info['capacity'],
+            {words[i]: count for i, count in zip(ids, counts)},
+            {words[i]: error for i, error in zip(ids, errors)},
+            info['total']
+        )
+    return Counter(dict(zip(map(words.__getitem__, ids), counts)))
+
+
+def read_snapshot(path):
+    """(signature, [(feed name, FeedState)], seen entries or None) from a
+    snapshot file
+
+    The file is memory-mapped, so only the blobs actually decoded are
+    paged in. Raises ValueError if it is not a snapshot.
+    """
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if mapped[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'{path} is not an analyzer snapshot')
+        (header_length,) = _HEADER_LENGTH.unpack_from(mapped, len(MAGIC))
+        header_start = len(MAGIC) + _HEADER_LENGTH.size
+        header = json.loads(mapped[header_start:header_start + header_length])
+        view = memoryview(mapped)[header_start + header_length:]
+        try:
+            def blob(span):
+                return view[span[0]:span[0] + span[1]]
+
+            words = bytes(blob(header['vocabulary'])).decode('utf-8').split('\0')
+            seen_entries = bytes(blob(header['seen_entries'])) if 'seen_entries' in header else None
+            states = []
+            for feed in header['feeds']:
+                unique_words = feed.get('unique_words')
+                states.append((feed['name'], FeedState(
+                    feed['url'],
+                    json.loads(zlib.decompress(blob(feed['articles']))),
+                    _read_counts(view, feed['word_counts'], words),
+                    ngram_counts={int(n): _read_counts(view, info, words)
+                                  for n, info in feed['ngram_counts'].items()},
+                    unique_words=HyperLogLog.from_bytes(bytes(blob(unique_words)))
+                    if unique_words else None,
+                    daily_unique_words={day: HyperLogLog.from_bytes(bytes(blob(span)))
+                                        for day, span in feed['daily_unique_words'].items()},
+                    fetched_at=feed['fetched_at'],
+                    body_hash=feed['body_hash'],
+                    etag=feed['etag'],
+                    last_modified=feed['last_modified'],
+                    fetches=feed['fetches'],
+                    unchanged_fetches=feed['unchanged_fetches']
+                )))
+        finally:
+            # The mmap cannot close while slices of it are still exported
+            view.release()
+    return header['signature'], states, seen_entries
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Stemming for the RSS Word Frequency Analyzer
+A dependency-free Porter stemmer and a memoizing wrapper that also
+remembers which surface forms map to each stem.
+"""
+
+import threading
+from collections import OrderedDict
+
+_VOWELS = frozenset('aeiou')
+
+
+def _is_consonant(word, i):
+    char = word[i]
+    if char in _VOWELS:
+        return False
+    if char == 'y':
+        return i == 0 or not _is_consonant(word, i - 1)
+    return True
+
+
+def _measure(stem):
+    """Number of vowel-consonant sequences (m in Porter's paper)"""
+    m = 0
+    previous_vowel = False
+    for i in range(len(stem)):
+        consonant = _is_consonant(stem, i)
+        if consonant and previous_vowel:
+            m += 1
+        previous_vowel = not consonant
+    return m
+
+
+def _has_vowel(stem):
+    return any(not _is_consonant(stem, i) for i in range(len(stem)))
+
+
+def _ends_double_consonant(word):
+    return (len(word) >= 2 and word[-1] == word[-2]
+            and _is_consonant(word, len(word) - 1))
+
+
+def _ends_cvc(word):
+    """consonant-vowel-consonant, where the last consonant is not w, x or y"""
+    return (len(word) >= 3
+            and _is_consonant(word, len(word) - 3)
+            and not _is_consonant(word, len(word) - 2)
+            and _is_consonant(word, len(word) - 1)
+            and word[-1] not in 'wxy')
+
+
+def _replace_suffix(word, rules, min_measure):
+    """Apply the first rule whose suffix matches, if the stem's measure allows"""
+    for suffix, replacement in rules:
+        if word.endswith(suffix):
+            stem = word[:len(word) - len(suffix)]
+            if _measure(stem) > min_measure:
+                return stem + replacement
+            return word
+    return word
+
+
+_STEP2 = (
+    ('ational', 'ate'), ('tional', 'tion'), ('enci', 'ence'), ('anci', 'ance'),
+    ('izer', 'ize'), ('abli', 'able'), ('alli', 'al'), ('entli', 'ent'),
+    ('eli', 'e'), ('ousli', 'ous'), ('ization', 'ize'), ('ation', 'ate'),
+    ('ator', 'ate'), ('alism', 'al'), ('iveness', 'ive'), ('fulness', 'ful'),
+    ('ousness', 'ous'), ('aliti', 'al'), ('iviti', 'ive'), ('biliti', 'ble'),
+)
+_STEP3 = (
+    ('icate', 'ic'), ('ative', ''), ('alize', 'al'), ('iciti', 'ic'),
+    ('ical', 'ic'), ('ful', ''), ('ness', ''),
+)
+# Longest suffix first, so the first match is the one Porter's step 4 uses
+_STEP4 = tuple(sorted((
+    'al', 'ance', 'ence', 'er', 'ic', 'able', 'ible', 'ant', 'ement', 'ment',
+    'ent', 'ion', 'ou', 'ism', 'ate', 'iti', 'ous', 'ive', 'ize',
+), key=len, reverse=True))
+
+
+def porter_stem(word):
+    """Stem a lowercase word with the original Porter (1980) algorithm"""
+    if len(word) <= 2:
+        return word
+
+    # Step 1a: plurals
+    if word.endswith('sses'):
+        word = word[:-2]
+    elif word.endswith('ies'):
+        word = word[:-2]
+    elif word.endswith('s') and not word.endswith('ss'):
+        word = word[:-1]
+
+    # Step 1b: -eed, -ed, -ing
+    if word.endswith('eed'):
+        if _measure(word[:-3]) > 0:
+            word = word[:-1]
+    else:
+        for suffix in ('ed', 'ing'):
+            if word.endswith(suffix) and _has_vowel(word[:-len(suffix)]):
+                word = word[:-len(suffix)]
+                if word.endswith(('at', 'bl', 'iz')):
+                    word += 'e'
+                elif _ends_double_consonant(word) and word[-1] not in 'lsz':
+                    word = word[:-1]
+                elif _measure(word) == 1 and _ends_cvc(word):
+                    word += 'e'
+                break
+
+    # Step 1c: y -> i
+    if word.endswith('y') and _has_vowel(word[:-1]):
+        word = word[:-1] + 'i'
+
+    # Steps 2 and 3: double and single suffixes
+    word = _replace_suffix(word, _STEP2, 0)
+    word = _replace_suffix(word, _STEP3, 0)
+
+    # Step 4: remove suffixes when m > 1
+    for suffix in _STEP4:
+        if word.endswith(suffix):
+            stem = word[:-len(suffix)]
+            if _measure(stem) > 1:
+                if suffix != 'ion' or stem.endswith(('s', 't')):
+                    word = stem
+            break
+
+    # Step 5: tidy up a final -e and -ll
+    if word.endswith('e'):
+        stem = word[:-1]
+        m = _measure(stem)
+        if m > 1 or (m == 1 and not _ends_cvc(stem)):
+            word = stem
+    if _ends_double_consonant(word) and word.endswith('l') and _measure(word) > 1:
+        word = word[:-1]
+
+    return word
+
+
+class MemoizedStemmer:
+    """Bounded LRU memo around a stemming function
+
+    The vocabulary is far smaller than the token stream, so once warm
+    almost every call is a dictionary lookup.
+    """
+
+    def __init__(self, stem=porter_stem, max_entries=200000):
+        self._stem = stem
+        self.max_entries = max_entries
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def stem(self, word):
+        with self._lock:
+            stemmed = self._memo.get(word)
+            if stemmed is not None:
+                self._memo.move_to_end(word)
+                self.hits += 1
+                return stemmed
+            self.misses += 1
+        stemmed = self._stem(word)
+        with self._lock:
+            self._memo[word] = stemmed
+            if len(self._memo) > self.max_entries:
+                self._memo.popitem(last=False)
+        return stemmed
+
+    def group(self, ranked_words, skip=()):
+        """Group (word, count) pairs by stem
+
+        Returns a list of (stem, total, forms) sorted by total, where forms
+        is a list of (word, count) with the most frequent surface form first.
+        Words in skip are left out before grouping.
+        """
+        groups = {}
+        for word, count in ranked_words:
+            if word in skip:
+                continue
+            stemmed = self.stem(word)
+            group = groups.get(stemmed)
+            if group is None:
+                groups[stemmed] = [count, [(word, count)]]
+            else:
+                group[0] += count
+                group[1].append((word, count))
+        # ranked_words is sorted, so each forms list already is too
+        return sorted(
+            ((stemmed, total, forms) for stemmed, (total, forms) in groups.items()),
+            key=lambda item: item[1], reverse=True
+        )
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._memo),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Text pipeline for the RSS Word Frequency Analyzer
+Turns raw feed markup into plain text and tokens that can be fed
+straight into word counters.
+"""
+
+import re
+import html
+import sys
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+
+# Script/style blocks and comments are cut first: only their opening is
+# matched by a regex, and their end is found by a separate forward search
+# whose result is reused, so unclosed openers cannot make the scan
+# quadratic. Tags and entities are then replaced in one pass. Tags use
+# [^<>] so an unclosed '<' stops at the next '<' instead of rescanning the
+# rest of the text. The tag names are spelled as character classes because
+# re.IGNORECASE slows the scan down.
+_BLOCK_OPEN_RE = re.compile(r'<(?:([Ss][Cc][Rr][Ii][Pp][Tt]|[Ss][Tt][Yy][Ll][Ee])\b[^<>]*>|!--)')
+_BLOCK_CLOSE_RE = {
+    'script': re.compile(r'</[Ss][Cc][Rr][Ii][Pp][Tt]\s*>'),
+    'style': re.compile(r'</[Ss][Tt][Yy][Ll][Ee]\s*>'),
+}
+_MARKUP_RE = re.compile(
+    r'<[^<>]*>'
+    r'|&(?:#[0-9]{1,7}|#[xX][0-9a-fA-F]{1,6}|[A-Za-z][A-Za-z0-9]{1,31});?'
+)
+
+# Decoded entities, so html.unescape runs once per distinct entity
+_ENTITY_CACHE = {}
+_ENTITY_CACHE_LIMIT = 4096
+
+
+def _replace_markup(match):
+    """Replace a tag with a space and an entity with its decoded text"""
+    token = match.group(0)
+    if token[0] != '&':
+        return ' '
+    decoded = _ENTITY_CACHE.get(token)
+    if decoded is None:
+        decoded = html.unescape(token)
+        if len(_ENTITY_CACHE) < _ENTITY_CACHE_LIMIT:
+            _ENTITY_CACHE[token] = decoded
+    return decoded
+
+
+def _cut_blocks(markup):
+    """Replace script/style blocks and comments with a space
+
+    An opener without its closer is left in place, so an unclosed block
+    loses only its opening tag and an unclosed comment is treated as an
+    ordinary tag. The last closer found for each kind is reused until the
+    scan passes it, and a missing closer is missing for every later opener
+    too, so each kind's closers are searched for in one forward sweep.
+    """
+    pieces = []
+    closers = {}  # kind -> (start, end) of its next closer, or (-1, -1)
+    pos = 0
+    for match in _BLOCK_OPEN_RE.finditer(markup):
+        start, end = match.span()
+        if start < pos:
+            continue  # inside a block already cut
+        kind = match.group(1).lower() if match.group(1) else '-->'
+        closer = closers.get(kind)
+        if closer is None or 0 <= closer[0] < end:
+            if kind == '-->':
+                index = markup.find('-->', end)
+                closer = (index, index + 3) if index >= 0 else (-1, -1)
+            else:
+                found = _BLOCK_CLOSE_RE[kind].search(markup, end)
+                closer = found.span() if found else (-1, -1)
+            closers[kind] = closer
+        if closer[1] < 0:
+            continue
+        pieces.append(markup[pos:start])
+        pieces.append(' ')
+        pos = closer[1]
+    if not pieces:
+        return markup
+    pieces.append(markup[pos:])
+    return ''.join(pieces)
+
+
+def html_to_text(markup):
+    """Strip tags, script/style content and comments, and decode entities"""
+    if not markup:
+        return ''
+    if '<' not in markup and '&' not in markup:
+        return markup
+    return _MARKUP_RE.sub(_replace_markup, _cut_blocks(markup))
+
+
+def legacy_strip_tags(markup):
+    """The original tag-stripping regex, kept for benchmarking"""
+    return re.sub('<[^<]+?>', '', markup)
+
+
+class Tokenizer:
+    """Base tokenizer: lowercase words matched by a compiled pattern
+
+    Subclasses provide the letter class; min_length/max_length form the
+    token-length policy. Words outside the policy are dropped whole rather
+    than truncated, so a 40-letter run of junk never becomes a token.
+    """
+
+    name = None
+    letters = None
+    flags = 0
+
+    def __init__(self, min_length=3, max_length=None):
+        if min_length < 1:
+            raise ValueError('min_length must be at least 1')
+        if max_length is not None and max_length < min_length:
+            raise ValueError('max_length must not be smaller than min_length')
+        self.min_length = min_length
+        self.max_length = max_length
+        upper = '' if max_length is None else str(max_length)
+        self.pattern = re.compile(
+            r'\b%s{%d,%s}\b' % (self.letters, min_length, upper), self.flags
+        )
+
+    def tokenize(self, text):
+        """Return the lowercase tokens in text"""
+        if not text:
+            return []
+        # Lowercasing the whole string once is cheaper than per token
+        return self.pattern.findall(text.lower())
+
+    def settings(self):
+        """Settings needed to rebuild this tokenizer with make_tokenizer"""
+        return {'mode': self.name, 'min_length': self.min_length, 'max_length': self.max_length}
+
+
+class UnicodeTokenizer(Tokenizer):
+    """Letters from any script (café, Москва), no digits or underscores"""
+
+    name = 'unicode'
+    letters = r'[^\W\d_]'
+
+
+class AsciiTokenizer(Tokenizer):
+    """ASCII letters only; the original behaviour and the fastest mode"""
+
+    name = 'ascii'
+    letters = r'[a-z]'
+
+
+TOKENIZERS = {
+    UnicodeTokenizer.name: UnicodeTokenizer,
+    AsciiTokenizer.name: AsciiTokenizer,
+}
+
+
+def make_tokenizer(mode='unicode', min_length=3, max_length=None):
+    """Build a registered tokenizer by name"""
+    if mode not in TOKENIZERS:
+        raise ValueError(f"Unknown tokenizer mode: {mode}")
+    return TOKENIZERS[mode](min_length=min_length, max_length=max_length)
+
+
+class TokenCountCache:
+    """Bounded LRU cache from text to its token Counter
+
+    Keys are 16-byte BLAKE2 digests of the text, so the cache never holds
+    the text itself. Entries are evicted least-recently-used first when
+    either max_entries or max_bytes (an estimate of Counter size) is hit.
+    Returned Counters are shared and must not be modified by callers.
+    """
+
+    def __init__(self, max_entries=50000, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(text):
+        return hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+    @staticmethod
+    def _estimate_size(counts):
+        return sys.getsizeof(counts) + sum(sys.getsizeof(word) for word in counts) + 64
+
+    def get_counts(self, text, tokenize):
+        """Return the token Counter for text, calling tokenize only on a miss"""
+        if not text:
+            return Counter()
+        key = self._key(text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        counts = Counter(tokenize(text))
+        self._store(key, counts)
+        return counts
+
+    def put(self, text, counts):
+        """Cache counts tokenized elsewhere, e.g. alongside n-grams"""
+        if text:
+            self._store(self._key(text), counts)
+
+    def _store(self, key, counts):
+        size = self._estimate_size(counts)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (counts, size)
+                self.current_bytes += size
+                while len(self._entries) > self.max_entries or self.current_bytes > self.max_bytes:
+                    _, (_, evicted_size) = self._entries.popitem(last=False)
+                    self.current_bytes -= evicted_size
+                    self.evictions += 1
+
+    def clear(self):
+        """Drop every entry, e.g. after the tokenizer changes"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """Hit-rate and size metrics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+def iter_ngrams(tokens, n, skip_edges=()):
+    """Space-joined n-grams of tokens, skipping those that start or end in skip_edges"""
+    for i in range(len(tokens) - n + 1):
+        if tokens[i] in skip_edges or tokens[i + n - 1] in skip_edges:
+            continue
+        yield ' '.join(tokens[i:i + n])
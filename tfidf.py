@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+TF-IDF distinctive terms for the RSS Word Frequency Analyzer
+A sparse document-term matrix over the retained articles, updated
+incrementally as entries arrive and leave, scored per feed or per group
+of feeds.
+"""
+
+import heapq
+import math
+import threading
+from collections import Counter
+
+
+class DocumentTermMatrix:
+    """Sparse article x term counts with running document frequencies
+
+    Each row is the term Counter of one article, stored under
+    (feed name, entry key). Document frequencies and per-feed term totals
+    are kept up to date on every add and remove, so scoring never rescans
+    the articles; it only walks the vocabulary of the feeds asked for.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = {}  # (feed name, entry key) -> Counter
+        self._feed_keys = {}  # feed name -> set of entry keys
+        self.document_frequency = Counter()
+        self.feed_counts = {}  # feed name -> Counter summed over its rows
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _add(self, feed_name, key, counts):
+        self._rows[(feed_name, key)] = counts
+        self._feed_keys.setdefault(feed_name, set()).add(key)
+        self.document_frequency.update(counts.keys())
+        self.feed_counts.setdefault(feed_name, Counter()).update(counts)
+
+    def _remove(self, feed_name, key):
+        counts = self._rows.pop((feed_name, key))
+        self._feed_keys[feed_name].discard(key)
+        self.document_frequency.subtract(counts.keys())
+        feed_counts = self.feed_counts[feed_name]
+        feed_counts.subtract(counts)
+        for term in counts:
+            if self.document_frequency[term] <= 0:
+                del self.document_frequency[term]
+            if feed_counts[term] <= 0:
+                del feed_counts[term]
+
+    def sync(self, feed_name, documents, count):
+        """Make feed_name's rows match documents, a mapping of entry key -> article
+
+        count(article) is only called for entries that are not already
+        rows; rows of entries that left the feed are removed.
+        """
+        with self._lock:
+            current = self._feed_keys.get(feed_name, set())
+            for key in current - documents.keys():
+                self._remove(feed_name, key)
+        added = {key: count(article) for key, article in documents.items()
+                 if key not in current}
+        with self._lock:
+            for key, counts in added.items():
+                if (feed_name, key) not in self._rows:
+                    self._add(feed_name, key, counts)
+
+    def forget(self, keep):
+        """Drop the rows of feeds not in keep"""
+        with self._lock:
+            for feed_name in list(self._feed_keys):
+                if feed_name not in keep:
+                    for key in list(self._feed_keys[feed_name]):
+                        self._remove(feed_name, key)
+                    del self._feed_keys[feed_name]
+                    del self.feed_counts[feed_name]
+
+    def clear(self):
+        with self._lock:
+            self._rows.clear()
+            self._feed_keys.clear()
+            self.document_frequency.clear()
+            self.feed_counts.clear()
+
+    def distinctive_terms(self, feed_names, limit=25, skip=(), min_df=2):
+        """Highest TF-IDF terms of the given feeds taken together
+
+        tf is a term's share of all terms in those feeds and idf is
+        log((1 + N) / (1 + df)) over all N articles, so words common to
+        every article score zero and are dropped. Terms in fewer than min_df
+        articles or in skip are left out too.
+        """
+        with self._lock:
+            total_documents = len(self._rows)
+            counts = Counter()
+            for feed_name in feed_names:
+                counts.update(self.feed_counts.get(feed_name, ()))
+            df = self.document_frequency
+            total_terms = sum(counts.values())
+            if not total_terms:
+                return []
+            scored = (
+                (term, count / total_terms * math.log((1 + total_documents) / (1 + df[term])), count)
+                for term, count in counts.items()
+                if df[term] >= min_df and term not in skip
+            )
+            top = heapq.nlargest(limit, (item for item in scored if item[1] > 0),
+                                 key=lambda item: item[1])
+        return [{'word': term, 'score': round(score, 6), 'frequency': count}
+                for term, score, count in top]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'documents': len(self._rows),
+                'vocabulary': len(self.document_frequency),
+                'nonzero': sum(len(counts) for counts in self._rows.values())
+            }
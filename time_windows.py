@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Time helpers for the RSS Word Frequency Analyzer
+Parses entry timestamps and groups them into UTC buckets.
+"""
+
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+
+
+def parse_published(value, default=None):
+    """Parse an RSS (RFC 822) or Atom (ISO 8601) timestamp into an aware UTC datetime"""
+    if not value:
+        return default
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        try:
+            parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+        except ValueError:
+            return default
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def day_key(moment):
+    """UTC day bucket of a datetime, e.g. '2024-01-31'"""
+    return moment.strftime('%Y-%m-%d')
+
+
+def recent_day_keys(days, now=None):
+    """Day keys for the last `days` UTC days, today included"""
+    now = now or datetime.now(timezone.utc)
+    return [day_key(now - timedelta(days=offset)) for offset in range(days)]
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Burst detection for the RSS Word Frequency Analyzer
+Keeps an exponentially weighted baseline of every word's hourly count and
+scores how far the current hour's count sits above it.
+"""
+
+import heapq
+import math
+import threading
+
+# Words not seen for this many hours have a negligible baseline and are dropped
+PRUNE_AFTER_HOURS = 14 * 24
+
+
+class BurstDetector:
+    """Incremental EWMA mean and variance of each word's count per UTC hour
+
+    Each word keeps [open hour, count in it, baseline mean, baseline
+    variance]. When a word is next seen in a later hour, the open count is
+    folded into the baseline and the empty hours in between decay it, so
+    work is proportional to the tokens observed, never to the vocabulary.
+    Words counted in the latest hour are tracked separately, which is all
+    a trending query has to look at.
+    """
+
+    def __init__(self, half_life_hours=24):
+        self.alpha = 1 - 0.5 ** (1 / half_life_hours)
+        self._lock = threading.Lock()
+        self._words = {}  # word -> [hour, count, mean, variance]
+        self.latest_hour = None
+        self._latest_words = set()
+        self._pruned_at = None
+
+    def __len__(self):
+        return len(self._words)
+
+    def _fold(self, state, hour):
+        """Close state's open hour into the baseline and decay it up to hour"""
+        alpha = self.alpha
+        open_hour, count, mean, variance = state
+        diff = count - mean
+        mean += alpha * diff
+        variance = (1 - alpha) * (variance + alpha * diff * diff)
+        # Each empty hour is an observation of zero; after a few hundred the
+        # baseline is negligible either way
+        for _ in range(min(hour - open_hour - 1, PRUNE_AFTER_HOURS)):
+            variance = (1 - alpha) * (variance + alpha * mean * mean)
+            mean *= 1 - alpha
+        state[:] = [hour, 0, mean, variance]
+
+    def observe(self, hour, counts):
+        """Add the word counts of one entry published in the given UTC hour"""
+        with self._lock:
+            if self.latest_hour is None or hour > self.latest_hour:
+                self.latest_hour = hour
+                self._latest_words = set()
+            words = self._words
+            for word, count in counts.items():
+                state = words.get(word)
+                if state is None:
+                    state = words[word] = [hour, 0, 0.0, 0.0]
+                elif hour > state[0]:
+                    self._fold(state, hour)
+                elif hour < state[0]:
+                    # A late entry for a closed hour only nudges the baseline
+                    state[2] += self.alpha * count * (1 - self.alpha) ** (state[0] - hour - 1)
+                    continue
+                state[1] += count
+                if hour == self.latest_hour:
+                    self._latest_words.add(word)
+            self._prune(hour)
+
+    def _prune(self, hour):
+        if self._pruned_at is not None and hour - self._pruned_at < 24:
+            return
+        self._pruned_at = hour
+        cutoff = hour - PRUNE_AFTER_HOURS
+        for word in [word for word, state in self._words.items() if state[0] < cutoff]:
+            del self._words[word]
+
+    def trending(self, now_hour, limit=25, min_count=3, skip=()):
+        """Words surging in the latest hour, highest z-score first
+
+        The latest hour only counts while it is the current or the previous
+        hour. z = (count - mean) / sqrt(variance + 1); the +1 keeps words
+        with no history from scoring infinitely high off a single mention.
+        """
+        with self._lock:
+            if self.latest_hour is None or self.latest_hour < now_hour - 1:
+                return []
+            scored = []
+            for word in self._latest_words:
+                if word in skip:
+                    continue
+                _, count, mean, variance = self._words[word]
+                if count < min_count:
+                    continue
+                scored.append((word, (count - mean) / math.sqrt(variance + 1), count, mean))
+        top = heapq.nlargest(limit, scored, key=lambda item: item[1])
+        return [{'word': word, 'score': round(score, 3), 'count': count,
+                 'baseline': round(mean, 3)}
+                for word, score, count, mean in top if score > 0]
+
+    def clear(self):
+        with self._lock:
+            self._words.clear()
+            self._latest_words = set()
+            self.latest_hour = None
+            self._pruned_at = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'words': len(self._words),
+                'latest_hour_words': len(self._latest_words),
+                'half_life_hours': round(math.log(0.5) / math.log(1 - self.alpha), 1)
+            }
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Keyword watchlist for the RSS Word Frequency Analyzer
+Scans entries the first time they are stored for watched terms and keeps
+a bounded log of the matches.
+"""
+
+import threading
+import time
+from collections import deque
+
+from aho_corasick import AhoCorasick
+
+MAX_ALERTS = 1000  # oldest alerts are dropped beyond this
+
+
+class Watchlist:
+    """Watched terms compiled into one Aho-Corasick automaton
+
+    Every entry is scanned once, in a single pass over its title and
+    description, however many terms are watched. Which entries are new is
+    up to the caller (the seen-entry filter), so restarts do not re-alert.
+    """
+
+    def __init__(self, terms=(), max_alerts=MAX_ALERTS):
+        self._lock = threading.Lock()
+        self.alerts = deque(maxlen=max_alerts)
+        self._next_id = 1
+        self.set_terms(terms)
+
+    def set_terms(self, terms):
+        """Replace the watched terms; entries already seen are not rescanned"""
+        matcher = AhoCorasick(terms)
+        with self._lock:
+            self.matcher = matcher
+
+    @property
+    def terms(self):
+        return self.matcher.phrases
+
+    def scan(self, feed_name, articles):
+        """Record an alert for every entry of feed_name that mentions a term;
+        pass only entries not scanned before
+
+        Returns the alerts that were added.
+        """
+        matcher = self.matcher
+        if not matcher.phrases:
+            return []
+
+        found = []
+        for article in articles:
+            text = f"{article['title']}\n{article['description']}"
+            indexes = sorted({index for _, _, index in matcher.find_spans(text)})
+            if indexes:
+                found.append({
+                    'terms': [matcher.phrases[index] for index in indexes],
+                    'feed_name': feed_name,
+                    'title': article['title'],
+                    'link': article['link'],
+                    'published': article['published'],
+                    'matched_at': time.time()
+                })
+
+        with self._lock:
+            for alert in found:
+                alert['id'] = self._next_id
+                self._next_id += 1
+                self.alerts.append(alert)
+        return found
+
+    def recent(self, since=0, limit=100, term=None):
+        """Newest alerts first, with id greater than since, optionally for one term"""
+        with self._lock:
+            alerts = list(self.alerts)
+        results = []
+        for alert in reversed(alerts):
+            if alert['id'] <= since:
+                break
+            if term is not None and term not in alert['terms']:
+                continue
+            results.append(alert)
+            if len(results) >= limit:
+                break
+        return results
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Sliding-window word counts for the RSS Word Frequency Analyzer
+Word counts bucketed by the hour each entry was published, kept in fixed
+rings of hourly counters so the last hour, day or week is answered by
+merging that many buckets plus the current, partial one.
+"""
+
+import threading
+import time
+from collections import Counter
+
+from feed_cache import entry_key
+
+HOUR = 3600
+RING_HOURS = 7 * 24 + 1  # the longest window plus the current, partial hour
+WINDOWS = {'1h': 1, '24h': 24, '7d': 7 * 24}
+
+
+class HourlyRing:
+    """One Counter per UTC hour for the last `hours` hours
+
+    Hour h lives in slot h % hours; a slot holding an older hour is reset
+    when a newer one claims it, so the ring never grows.
+    """
+
+    def __init__(self, hours=RING_HOURS):
+        self.hours = hours
+        self._slot_hours = [None] * hours
+        self._slots = [None] * hours
+
+    def add(self, hour, counts):
+        """Add counts to hour's bucket; False if hour is older than the ring"""
+        index = hour % self.hours
+        slot_hour = self._slot_hours[index]
+        if slot_hour != hour:
+            if slot_hour is not None and slot_hour > hour:
+                return False
+            self._slot_hours[index] = hour
+            self._slots[index] = Counter()
+        self._slots[index].update(counts)
+        return True
+
+    def get(self, hour):
+        """Counter of hour, or None if the ring does not hold it"""
+        index = hour % self.hours
+        return self._slots[index] if self._slot_hours[index] == hour else None
+
+    def subtract(self, other):
+        """Remove the buckets of another ring that were added into this one"""
+        for hour, counts in other.buckets():
+            index = hour % self.hours
+            if self._slot_hours[index] == hour:
+                slot = self._slots[index]
+                slot.subtract(counts)
+                for word in counts:
+                    if slot[word] <= 0:
+                        del slot[word]
+
+    def buckets(self, first_hour=None, last_hour=None):
+        """(hour, Counter) pairs for filled slots between first_hour and last_hour"""
+        for hour, counts in zip(self._slot_hours, self._slots):
+            if hour is None:
+                continue
+            if first_hour is not None and hour < first_hour:
+                continue
+            if last_hour is not None and hour > last_hour:
+                continue
+            yield hour, counts
+
+
+class WindowedWordCounts:
+    """Hourly word counts per feed plus their running total over all feeds
+
+    Each entry is counted once, in the hour it was published (undated
+    entries in the hour they were first seen, future dates clamped to
+    now). Entries that drop off a feed stay counted until their hour
+    leaves the ring. The total ring is what windows are read from;
+    a feed's own ring is only kept to subtract it when the feed is dropped.
+    """
+
+    def __init__(self, hours=RING_HOURS):
+        self.hours = hours
+        self._lock = threading.Lock()
+        self._total = HourlyRing(hours)
+        self._rings = {}  # feed name -> HourlyRing
+        self._seen = {}  # feed name -> {entry key: hour}
+
+    def sync(self, feed_name, articles, count, now=None):
+        """Count the entries of feed_name not seen before with count(article)
+
+        Returns (hour, counts) of every entry added.
+        """
+        now = time.time() if now is None else now
+        now_hour = int(now // HOUR)
+        oldest = now_hour - self.hours + 1
+        with self._lock:
+            seen = self._seen.setdefault(feed_name, {})
+            for key in [key for key, hour in seen.items() if hour < oldest]:
+                del seen[key]
+            new = [(key, article) for key, article in
+                   ((entry_key(article), article) for article in articles)
+                   if key not in seen]
+
+        counted = []
+        for key, article in new:
+            # Logged and stored entries carry when they were first seen
+            published = article.get('published_ts') or article.get('first_seen') or now
+            hour = min(int(published // HOUR), now_hour)
+            if hour >= oldest:
+                counted.append((key, hour, count(article)))
+
+        added = []
+        with self._lock:
+            seen = self._seen.setdefault(feed_name, {})
+            ring = self._rings.setdefault(feed_name, HourlyRing(self.hours))
+            for key, hour, counts in counted:
+                if key in seen:
+                    continue
+                seen[key] = hour
+                ring.add(hour, counts)
+                self._total.add(hour, counts)
+                added.append((hour, counts))
+        return added
+
+    def window(self, hours, now=None):
+        """Word counts of the `hours` whole hours before the current one and
+        of the current hour so far, so at least `hours` hours are covered"""
+        now_hour = int((time.time() if now is None else now) // HOUR)
+        totals = Counter()
+        with self._lock:
+            for _, counts in self._total.buckets(now_hour - hours, now_hour):
+                totals.update(counts)
+        return totals
+
+    def feed_counts(self, first_hour, last_hour):
+        """{feed name: Counter} summed over hours first_hour..last_hour inclusive"""
+        with self._lock:
+            totals = {}
+            for feed_name, ring in self._rings.items():
+                counts = Counter()
+                for hour in range(first_hour, last_hour + 1):
+                    bucket = ring.get(hour)
+                    if bucket:
+                        counts.update(bucket)
+                if counts:
+                    totals[feed_name] = counts
+            return totals
+
+    def filled_hours(self):
+        """Hours that hold counts in the total ring"""
+        with self._lock:
+            return [hour for hour, counts in self._total.buckets() if counts]
+
+    def forget(self, keep):
+        """Drop the counts of feeds not in keep"""
+        with self._lock:
+            for feed_name in list(self._rings):
+                if feed_name not in keep:
+                    self._total.subtract(self._rings.pop(feed_name))
+                    self._seen.pop(feed_name, None)
+
+    def clear(self):
+        with self._lock:
+            self._total = HourlyRing(self.hours)
+            self._rings.clear()
+            self._seen.clear()
+
+    def stats(self):
+        with self._lock:
+            buckets = list(self._total.buckets())
+            return {
+                'buckets': len(buckets),
+                'entries': sum(len(seen) for seen in self._seen.values()),
+                'distinct_bucket_words': sum(len(counts) for _, counts in buckets)
+            }